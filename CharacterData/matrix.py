@@ -139,6 +139,109 @@ def rotz(a):
                       [0,0,1,0],
                       [0,0,0,1]])
 
+def invert_rigid(m):
+    """
+    Closed-form inverse of a rigid transform (orthonormal rotation plus
+    translation). Accepts a single 4x4 matrix or a stack of shape (..., 4, 4).
+    """
+    m = np.asarray(m)
+    rt = np.swapaxes(m[..., :3, :3], -1, -2)
+    inv = np.zeros_like(m)
+    inv[..., :3, :3] = rt
+    inv[..., :3, 3] = -np.einsum('...ij,...j->...i', rt, m[..., :3, 3])
+    inv[..., 3, 3] = 1
+    return inv
+
+def dual_quaternions_from_rigid(m):
+    """
+    Convert a stack of rigid transforms (B, 4, 4) to unit dual quaternions.
+    Returns (real, dual), each (B, 4) in (w, x, y, z) order. The rotation
+    part uses the same eigenvector method as
+    transformations.quaternion_from_matrix, batched.
+    """
+    m = np.asarray(m, dtype=np.float64)
+    r = m[:, :3, :3]
+    K = np.zeros((len(m), 4, 4), dtype=np.float64)
+    K[:, 0, 0] = r[:, 0, 0] - r[:, 1, 1] - r[:, 2, 2]
+    K[:, 1, 0] = r[:, 0, 1] + r[:, 1, 0]
+    K[:, 1, 1] = r[:, 1, 1] - r[:, 0, 0] - r[:, 2, 2]
+    K[:, 2, 0] = r[:, 0, 2] + r[:, 2, 0]
+    K[:, 2, 1] = r[:, 1, 2] + r[:, 2, 1]
+    K[:, 2, 2] = r[:, 2, 2] - r[:, 0, 0] - r[:, 1, 1]
+    K[:, 3, 0] = r[:, 2, 1] - r[:, 1, 2]
+    K[:, 3, 1] = r[:, 0, 2] - r[:, 2, 0]
+    K[:, 3, 2] = r[:, 1, 0] - r[:, 0, 1]
+    K[:, 3, 3] = r[:, 0, 0] + r[:, 1, 1] + r[:, 2, 2]
+    K /= 3.0
+    # Quaternion is the eigenvector of K with the largest eigenvalue (eigh sorts ascending)
+    _, V = np.linalg.eigh(K, UPLO='L')
+    real = V[:, [3, 0, 1, 2], 3]
+    real *= np.where(real[:, :1] < 0.0, -1.0, 1.0)
+
+    # dual = 0.5 * (0, t) * real
+    t = m[:, :3, 3]
+    w, v = real[:, :1], real[:, 1:]
+    dual = np.empty_like(real)
+    dual[:, :1] = -0.5 * np.sum(t * v, axis=1, keepdims=True)
+    dual[:, 1:] = 0.5 * (w * t + np.cross(t, v))
+    return real, dual
+
+def _axis_rotations(axis, a):
+    """Batched elementary rotations (B, 3, 3) about 'X', 'Y' or 'Z' by radians a (B,)."""
+    s, c = np.sin(a), np.cos(a)
+    R = np.zeros((len(a), 3, 3), dtype=np.float64)
+    i, j = {'X': (1, 2), 'Y': (2, 0), 'Z': (0, 1)}[axis]
+    k = 3 - i - j
+    R[:, k, k] = 1
+    R[:, i, i] = c
+    R[:, j, j] = c
+    R[:, i, j] = -s
+    R[:, j, i] = s
+    return R
+
+def _homogeneous(R, homogeneous):
+    if not homogeneous:
+        return R.astype(np.float32)
+    M = np.zeros((len(R), 4, 4), dtype=np.float32)
+    M[:, :3, :3] = R
+    M[:, 3, 3] = 1
+    return M
+
+def euler_matrices(angles, order='XYZ', homogeneous=True):
+    """
+    Batched Euler rotations as plain float32 ndarrays.
+    angles is (B, 3) in degrees, given per axis as (x, y, z) regardless of
+    order. order lists the axes in matrix product order, e.g. 'XYZ' gives
+    Rx * Ry * Rz (three.js convention) and 'ZYX' gives Rz * Ry * Rx.
+    Returns (B, 4, 4), or (B, 3, 3) if homogeneous is False.
+    """
+    angles = np.radians(np.asarray(angles, dtype=np.float64).reshape(-1, 3))
+    R = None
+    for axis in order.upper():
+        Ra = _axis_rotations(axis, angles[:, 'XYZ'.index(axis)])
+        R = Ra if R is None else np.matmul(R, Ra)
+    return _homogeneous(R, homogeneous)
+
+def axis_angle_matrices(axes, angles, homogeneous=True):
+    """
+    Batched axis-angle rotations (Rodrigues) as plain float32 ndarrays.
+    axes is (B, 3), normalized here; angles is (B,) in degrees.
+    Returns (B, 4, 4), or (B, 3, 3) if homogeneous is False.
+    """
+    axes = np.asarray(axes, dtype=np.float64).reshape(-1, 3)
+    norm = np.linalg.norm(axes, axis=1, keepdims=True)
+    axes = axes / np.where(norm == 0, 1, norm)
+    a = np.radians(np.asarray(angles, dtype=np.float64).reshape(-1))
+    s, c = np.sin(a)[:, None, None], np.cos(a)[:, None, None]
+
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    zero = np.zeros_like(x)
+    K = np.stack([np.stack([zero, -z, y], axis=1),
+                  np.stack([z, zero, -x], axis=1),
+                  np.stack([-y, x, zero], axis=1)], axis=1)
+    R = c * np.identity(3) + s * K + (1 - c) * axes[:, :, None] * axes[:, None, :]
+    return _homogeneous(R, homogeneous)
+
 def lookat(eye, target, up):
     F = target[:3] - eye[:3]
     f = normalize(F)
@@ -1,7 +1,6 @@
 
 import json
 import numpy as np
-import numpy.linalg as la
 from collections import OrderedDict
 import os
 
@@ -16,10 +15,10 @@ class VertexBoneWeights(object):
         self._vertexCount = None
         self._wCounts = None
         self._nWeights = None
+        self._compiled = {}
         self.rootBone = rootBone
         self._data = self._build_vertex_weights_data(data, vertexCount, rootBone)
         self._calculate_num_weights()
-        self._compiled = {}
         self.name = ""
 
     @staticmethod
@@ -40,6 +39,57 @@ class VertexBoneWeights(object):
             vs, _ = wghts
             self._wCounts[vs] += 1
         self._nWeights = max(self._wCounts) if len(self._wCounts) > 0 else 0
+        self._compiled = {}
+
+    def compileData(self, boneNames, nWeights=None):
+        """
+        Compile weights into dense fixed-width arrays for vectorized skinning.
+        Returns (indices, weights), both shaped (V, K), where indices refer to
+        positions in boneNames. K defaults to the max number of influences per
+        vertex; a smaller K keeps the strongest weights and renormalizes them.
+        Weights of bones missing from boneNames are dropped.
+        """
+        nMax = int(self._nWeights)
+        k = nMax if not nWeights else min(int(nWeights), nMax)
+        key = (tuple(boneNames), k)
+        if key in self._compiled:
+            return self._compiled[key]
+
+        bone_lookup = {bname: i for i, bname in enumerate(boneNames)}
+        b_all, v_all, w_all = [], [], []
+        for bname, (vs, ws) in self._data.items():
+            b_idx = bone_lookup.get(bname)
+            if b_idx is None or len(vs) == 0:
+                continue
+            b_all.append(np.full(len(vs), b_idx, dtype=np.uint32))
+            v_all.append(np.asarray(vs, dtype=np.int64))
+            w_all.append(np.asarray(ws, dtype=np.float32))
+
+        vcount = self._vertexCount
+        indices = np.zeros((vcount, max(k, 1)), dtype=np.uint32)
+        weights = np.zeros((vcount, max(k, 1)), dtype=np.float32)
+        if b_all:
+            b_all = np.concatenate(b_all)
+            v_all = np.concatenate(v_all)
+            w_all = np.concatenate(w_all)
+
+            # Sort by vertex, strongest weight first, then rank within vertex
+            order = np.lexsort((-w_all, v_all))
+            b_all, v_all, w_all = b_all[order], v_all[order], w_all[order]
+            counts = np.bincount(v_all, minlength=vcount)
+            starts = np.cumsum(counts) - counts
+            rank = np.arange(len(v_all)) - starts[v_all]
+
+            keep = rank < k
+            indices[v_all[keep], rank[keep]] = b_all[keep]
+            weights[v_all[keep], rank[keep]] = w_all[keep]
+
+            if k < nMax:
+                wsum = weights.sum(axis=1, keepdims=True)
+                np.divide(weights, wsum, out=weights, where=wsum > 0)
+
+        self._compiled[key] = (indices, weights)
+        return indices, weights
 
     def _build_vertex_weights_data(self, vertexWeightsDict, vertexCount=None, rootBone="root"):
         WEIGHT_THRESHOLD = 1e-4
@@ -55,44 +105,41 @@ class VertexBoneWeights(object):
                  self._vertexCount = max([vn for vg in list(vertexWeightsDict.values()) for vn in vg[0]])+1
              return vertexWeightsDict
         
+        # Flatten all (bone, vertex, weight) triples in dict order
+        bnames = [bname for bname, vgroup in vertexWeightsDict.items() if len(vgroup) > 0]
+        groups = [np.asarray(vertexWeightsDict[bname], dtype=np.float64).reshape(-1, 2) for bname in bnames]
+        sizes = np.array([len(g) for g in groups], dtype=np.int64)
+        flat = np.concatenate(groups) if groups else np.zeros((0, 2), dtype=np.float64)
+        b_all = np.repeat(np.arange(len(bnames), dtype=np.int64), sizes)
+        v_all = flat[:, 0].astype(np.int64)
+        w_all = flat[:, 1].astype(np.float32)
+
         if vertexCount is not None:
             vcount = vertexCount
         else:
-             vals = [vn for vg in list(vertexWeightsDict.values()) for vn, _ in vg]
-             vcount = max(vals) + 1 if vals else 0
+            vcount = int(v_all.max()) + 1 if len(v_all) > 0 else 0
         self._vertexCount = vcount
 
         wtot = np.zeros(vcount, np.float32)
-        for vgroup in list(vertexWeightsDict.values()):
-            for item in vgroup:
-                vn,w = item
-                wtot[vn] += w
+        np.add.at(wtot, v_all, w_all)
+
+        # Normalize, then merge duplicate vertices within a bone.
+        # Unique keys come out sorted by bone, then by vertex.
+        keys, inverse = np.unique(b_all * vcount + v_all, return_inverse=True)
+        merged = np.zeros(len(keys), dtype=np.float32)
+        np.add.at(merged, inverse.reshape(-1), w_all / wtot[v_all])
+
+        keep = merged > WEIGHT_THRESHOLD
+        keys = keys[keep]
+        merged = merged[keep]
+        key_bones = keys // max(vcount, 1)
+        bounds = np.searchsorted(key_bones, np.arange(len(bnames) + 1))
 
         boneWeights = OrderedDict()
-        for bname,vgroup in list(vertexWeightsDict.items()):
-            if len(vgroup) == 0: continue
-            weights = []
-            verts = []
-            v_lookup = {}
-            for vn,w in vgroup:
-                if vn in v_lookup:
-                    v_idx = v_lookup[vn]
-                    weights[v_idx] += w/wtot[vn]
-                else:
-                    v_lookup[vn] = len(verts)
-                    verts.append(vn)
-                    weights.append(w/wtot[vn])
-            verts = np.asarray(verts, dtype=np.uint32)
-            weights = np.asarray(weights, np.float32)
-            
-            i_s = np.argsort(verts)
-            verts = verts[i_s]
-            weights = weights[i_s]
-            
-            i_s = np.argwhere(weights > WEIGHT_THRESHOLD)[:,0]
-            verts = verts[i_s]
-            weights = weights[i_s]
-            boneWeights[bname] = (verts, weights)
+        for i, bname in enumerate(bnames):
+            lo, hi = bounds[i], bounds[i + 1]
+            verts = (keys[lo:hi] - i * vcount).astype(np.uint32)
+            boneWeights[bname] = (verts, merged[lo:hi])
 
         if rootBone not in list(boneWeights.keys()):
             vs = []
@@ -206,6 +253,7 @@ class Bone(object):
              self._weight_reference_bones = list(set(weight_reference_bones))
              
         self.matRestGlobal = None
+        self.matRestGlobalInv = None # Inverse bind matrix, fixed per fit
         self.matRestRelative = None
         self.matPose = np.identity(4, np.float32)
         self.matPoseGlobal = None
@@ -223,11 +271,13 @@ class Bone(object):
         normal = self.get_normal(mesh)
         
         self.matRestGlobal = getMatrix(head3, tail3, normal)
+        # Rest matrices are orthonormal + translation, so the inverse is closed-form
+        self.matRestGlobalInv = matrix.invert_rigid(self.matRestGlobal)
         self.length = matrix.magnitude(tail3 - head3)
         
         if self.parent:
              # Relative to parent
-             self.matRestRelative = np.dot(la.inv(self.parent.matRestGlobal), self.matRestGlobal)
+             self.matRestRelative = np.dot(self.parent.matRestGlobalInv, self.matRestGlobal)
         else:
              self.matRestRelative = self.matRestGlobal
              
@@ -242,13 +292,8 @@ class Bone(object):
             
         # Transform from bind pose to current pose
         # matPoseVerts = GlobalPose * Inverse(GlobalBind)
-        # But GlobalBind is just matRestGlobal
-        try:
-            invRest = la.inv(self.matRestGlobal)
-            self.matPoseVerts = np.dot(self.matPoseGlobal, invRest)
-        except la.LinAlgError:
-            # Singular matrix - use identity as fallback
-            self.matPoseVerts = np.identity(4, np.float32)
+        # Inverse bind is precomputed once per fit in build()
+        self.matPoseVerts = np.dot(self.matPoseGlobal, self.matRestGlobalInv)
 
     def get_normal(self, mesh=None):
         if self.roll == 0:
@@ -373,27 +418,10 @@ class Skeleton(object):
                 has_retargeting = True
                 
                 # Collect weights from all referenced bones
-                combined_verts = {} # vert_idx -> weight
-                
-                for ref_name in refs:
-                    if ref_name in self.vertexWeights.data:
-                        vs, ws = self.vertexWeights.data[ref_name]
-                        for i, v in enumerate(vs):
-                            if v not in combined_verts:
-                                combined_verts[v] = 0.0
-                            combined_verts[v] += ws[i]
-                            
-                # Reconstruct arrays
-                if combined_verts:
-                    vs = np.array(list(combined_verts.keys()), dtype=np.uint32)
-                    ws = np.array(list(combined_verts.values()), dtype=np.float32)
-                    
-                    # Sort by vertex index
-                    idx_sorted = np.argsort(vs)
-                    vs = vs[idx_sorted]
-                    ws = ws[idx_sorted]
-                    
-                    new_weights_data[bname] = (vs, ws)
+                merged = self._merge_weights(
+                    [self.vertexWeights.data[ref_name] for ref_name in refs if ref_name in self.vertexWeights.data])
+                if merged is not None:
+                    new_weights_data[bname] = merged
             
             # If no reference, check if bone name matches source directly
             elif bname in source_bones:
@@ -420,35 +448,35 @@ class Skeleton(object):
             
             for target_bone, sources in extra_mapping.items():
                 if target_bone in self.vertexWeights.data:
-                    # Get existing target weights
-                    t_vs, t_ws = new_weights_data.get(target_bone, (np.array([], dtype=np.uint32), np.array([], dtype=np.float32)))
-                    
-                    # Convert to dict for merging
-                    combined = dict(zip(t_vs, t_ws))
-                    
-                    added = False
-                    for src in sources:
-                        if src in self.vertexWeights.data:
-                            s_vs, s_ws = self.vertexWeights.data[src]
-                            for i, v in enumerate(s_vs):
-                                if v not in combined:
-                                    combined[v] = 0.0
-                                combined[v] += s_ws[i]
-                            added = True
-                            
-                    if added:
-                        # Reconstruct arrays
-                        vs = np.array(list(combined.keys()), dtype=np.uint32)
-                        ws = np.array(list(combined.values()), dtype=np.float32)
-                        idx_sorted = np.argsort(vs)
-                        new_weights_data[target_bone] = (vs[idx_sorted], ws[idx_sorted])
+                    # Merge helper weights into existing target weights
+                    sources = [self.vertexWeights.data[src] for src in sources if src in self.vertexWeights.data]
+                    parts = [new_weights_data[target_bone]] if target_bone in new_weights_data else []
+                    merged = self._merge_weights(parts + sources)
+                    if sources and merged is not None:
+                        new_weights_data[target_bone] = merged
             
             print(f"[Skeleton] Retargeted weights for {len(new_weights_data)} bones (including cleanup).")
             # Replace data
             self.vertexWeights._data = new_weights_data
-            # Re-calculate metadata
+            # Re-calculate metadata (also drops stale compiled arrays)
             self.vertexWeights._calculate_num_weights()
 
+    @staticmethod
+    def _merge_weights(parts):
+        """
+        Sum a list of (verts, weights) pairs per vertex.
+        Returns (verts, weights) sorted by vertex index, or None if empty.
+        """
+        parts = [(vs, ws) for vs, ws in parts if len(vs) > 0]
+        if not parts:
+            return None
+        vs = np.concatenate([vs for vs, _ in parts])
+        ws = np.concatenate([ws for _, ws in parts]).astype(np.float32)
+        verts, inverse = np.unique(vs, return_inverse=True)
+        weights = np.zeros(len(verts), dtype=np.float32)
+        np.add.at(weights, inverse.reshape(-1), ws)
+        return verts.astype(np.uint32), weights
+
     def addBone(self, name, parentName, head, tail, roll, ref=None, w_ref=None):
         bone = Bone(self, name, parentName, head, tail, roll, ref, w_ref)
         self.bones[name] = bone
@@ -462,6 +490,67 @@ class Skeleton(object):
     def getBones(self):
         return self.boneslist
 
+    def getSkinningMatrices(self, boneNames=None):
+        """
+        Stack the bind-to-pose matrices (matPoseVerts) of the given bones
+        (default: all bones in breadth-first order) into a (B, 4, 4) array.
+        """
+        if boneNames is None:
+            boneNames = [bone.name for bone in self.boneslist]
+        return np.stack([np.asarray(self.bones[bname].matPoseVerts, dtype=np.float32) for bname in boneNames])
+
+    def skinMesh(self, verts, nWeights=None, dualQuaternion=False, indices=None):
+        """
+        Skin rest pose vertices (N, 3) with the current pose. Uses compiled
+        fixed-width weights, so the cost does not depend on the bone count.
+        nWeights optionally limits influences per vertex. dualQuaternion
+        selects dual quaternion skinning instead of linear blend skinning,
+        which preserves volume at strongly rotated joints.
+        indices optionally skins only those vertices of verts (returned in
+        that order).
+        """
+        boneNames = [bone.name for bone in self.boneslist]
+        b_idx, b_w = self.vertexWeights.compileData(boneNames, nWeights)
+        mats = self.getSkinningMatrices(boneNames)
+        verts = np.asarray(verts, dtype=np.float32)
+        if indices is not None:
+            b_idx, b_w, verts = b_idx[indices], b_w[indices], verts[indices]
+
+        if dualQuaternion:
+            return self._skinMeshDQ(verts, b_idx, b_w, mats)
+
+        # Blend the (3, 4) skinning matrices per vertex, then transform once
+        mats = mats[:, :3, :].reshape(-1, 12)
+        blended = np.einsum('vk,vkn->vn', b_w, mats[b_idx]).reshape(-1, 3, 4)
+        return np.einsum('vij,vj->vi', blended[:, :, :3], verts) + blended[:, :, 3]
+
+    @staticmethod
+    def _skinMeshDQ(verts, b_idx, b_w, mats):
+        real, dual = matrix.dual_quaternions_from_rigid(mats)
+        real = real.astype(np.float32)[b_idx]  # (V, K, 4)
+        dual = dual.astype(np.float32)[b_idx]
+
+        # Flip influences into the hemisphere of the strongest one, then blend
+        sign = np.where(np.sum(real * real[:, :1], axis=2) < 0.0, -1.0, 1.0).astype(np.float32)
+        w = b_w * sign
+        b_real = np.einsum('vk,vkq->vq', w, real)
+        b_dual = np.einsum('vk,vkq->vq', w, dual)
+
+        norm = np.linalg.norm(b_real, axis=1, keepdims=True)
+        valid = norm[:, 0] > 1e-8
+        norm[~valid] = 1.0
+        b_real /= norm
+        b_dual /= norm
+
+        rw, rv = b_real[:, :1], b_real[:, 1:]
+        dw, dv = b_dual[:, :1], b_dual[:, 1:]
+        # p' = R(q) p + t, with t = 2 * vec(dual * conj(real))
+        t = 2.0 * (rw * dv - dw * rv + np.cross(rv, dv))
+        posed = verts + 2.0 * np.cross(rv, np.cross(rv, verts) + rw * verts) + t
+        # Unweighted vertices collapse to the origin, like linear blending
+        posed[~valid] = 0.0
+        return posed
+
     def getJointPosition(self, joint_name, mesh):
         if joint_name in self.joint_pos_idxs:
             v_idxs = self.joint_pos_idxs[joint_name]
@@ -481,7 +570,7 @@ class Skeleton(object):
     def copy(self):
         # Create new empty skeleton
         new_skel = Skeleton(self.name)
-        new_skel.joints_pos_idxs = self.joint_pos_idxs # Ref copy OK, read only
+        new_skel.joint_pos_idxs = self.joint_pos_idxs # Ref copy OK, read only
         new_skel.planes = self.planes # Ref copy OK
         new_skel.vertexWeights = self.vertexWeights # Ref copy OK
         
@@ -0,0 +1,52 @@
+"""Binary response format for large numeric API payloads.
+
+Layout (all little-endian):
+    uint32      byte length N of the JSON header
+    N bytes     UTF-8 JSON header, space-padded to a multiple of 4
+    data        raw arrays back to back, each padded to a multiple of 4 bytes
+
+The header carries the regular JSON fields plus "buffers":
+{name: {"offset": byte offset into the data section, "length": element
+count, "dtype": one of DTYPES}}. The data section starts at byte 4 + N,
+so the browser can wrap each buffer as a typed array view without
+copying or parsing.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+DTYPES = {
+    "float32": np.dtype("<f4"),
+    "uint32": np.dtype("<u4"),
+    "int16": np.dtype("<i2"),
+    "uint16": np.dtype("<u2"),
+    "uint8": np.dtype("u1"),
+}
+
+
+def wants_binary(request):
+    """True if the client asked for the binary format (Accept header)."""
+    return BINARY_CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+def pack_arrays(header, arrays):
+    """Serialize a JSON header and {name: (array, dtype name)} into one body."""
+    buffers = {}
+    chunks = []
+    offset = 0
+    for name, (array, dtype) in arrays.items():
+        data = np.ascontiguousarray(array, dtype=DTYPES[dtype]).tobytes()
+        buffers[name] = {"offset": offset, "length": len(data) // DTYPES[dtype].itemsize, "dtype": dtype}
+        data += b"\0" * (-len(data) % 4)  # Keep the next buffer aligned
+        chunks.append(data)
+        offset += len(data)
+
+    meta = json.dumps({**header, "buffers": buffers}, separators=(",", ":")).encode("utf-8")
+    meta += b" " * (-len(meta) % 4)
+    return b"".join([struct.pack("<I", len(meta)), meta, *chunks])
+
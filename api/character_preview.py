@@ -0,0 +1,630 @@
+"""Character preview API for the Pose Studio widget.
+
+The preview is split in two parts:
+  * topology: triangle indices, UVs, bone hierarchy and skin weights (as
+    per-vertex top-4 attributes in the binary form). They never change for
+    a session, only between the two face-group variants (with or without
+    the genital helper), so they are built once per variant and served
+    from GET /vnccs/character_studio/topology with an ETag the browser
+    revalidates.
+  * morph-dependent arrays: vertex and joint positions, solved for every
+    slider change by POST /vnccs/character_studio/update_preview.
+
+Both speak JSON or the binary format of binary_payload.py. Solving and
+encoding run in a small dedicated thread pool, never on the aiohttp event
+loop, so other ComfyUI requests and websockets stay responsive while
+sliders are dragged.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web, WSMsgType, ClientError
+
+from .binary_payload import wants_binary, pack_arrays, BINARY_CONTENT_TYPE
+from .compression import compressed_response, response_encoding
+
+
+# Face groups shown in the preview (helper-genital only for male bodies)
+PREVIEW_FACE_GROUPS = ["body", "helper-r-eye", "helper-l-eye", "helper-upper-teeth", "helper-lower-teeth",
+                       "helper-tongue", "helper-genital"]
+GENITAL_MIN_GENDER = 0.99
+
+# Built topology bundles by variant name
+PREVIEW_TOPOLOGY = {}
+_TOPOLOGY_LOCK = threading.Lock()
+
+# Preview compute pool: at most PREVIEW_WORKERS solves at once, and at most
+# PREVIEW_MAX_QUEUE requests waiting for a worker (others get a 503)
+PREVIEW_WORKERS = 2
+PREVIEW_MAX_QUEUE = 16
+PREVIEW_EXECUTOR = {"pool": None}
+PREVIEW_STATS = {"queued": 0, "running": 0, "peak_queued": 0, "completed": 0, "rejected": 0, "stale": 0,
+                 "dropped": 0, "streams": 0}
+_STATS_LOCK = threading.Lock()
+
+# Per-session latest-wins state, only touched on the event loop:
+# {session: {"pending": future of the one request waiting, or None}}
+# A session is present while one of its solves is in flight.
+PREVIEW_SESSIONS = {}
+
+# Quantized vertex frames per session for delta updates (LRU over sessions):
+# {session: {"center", "scale", "frames": OrderedDict(version -> (V, 3) int16)}}
+VERTEX_SESSIONS = OrderedDict()
+_VERTEX_SESSIONS_LOCK = threading.Lock()
+VERTEX_MAX_SESSIONS = 32
+VERTEX_HISTORY = 4  # Recent versions a client may still reference as its base
+VERTEX_BOX_MARGIN = 0.1  # Quantization box padding, relative to the mesh size
+_VERTEX_VERSIONS = itertools.count(1)  # Unique across sessions, so a foreign base never matches
+
+# Frames per second pushed at most on a preview websocket
+PREVIEW_STREAM_FPS = 30
+
+
+class PreviewBusy(Exception):
+    """The preview queue is full."""
+
+
+def _get_preview_executor():
+    if PREVIEW_EXECUTOR["pool"] is None:
+        PREVIEW_EXECUTOR["pool"] = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix="vnccs_preview")
+    return PREVIEW_EXECUTOR["pool"]
+
+
+async def run_preview_task(fn, *args):
+    """Run fn(*args) in the preview pool, tracking queue depth. Raises PreviewBusy when full."""
+    with _STATS_LOCK:
+        if PREVIEW_STATS["queued"] >= PREVIEW_MAX_QUEUE:
+            PREVIEW_STATS["rejected"] += 1
+            raise PreviewBusy()
+        PREVIEW_STATS["queued"] += 1
+        PREVIEW_STATS["peak_queued"] = max(PREVIEW_STATS["peak_queued"], PREVIEW_STATS["queued"])
+
+    started = {"value": False}
+
+    def task():
+        with _STATS_LOCK:
+            started["value"] = True
+            PREVIEW_STATS["queued"] -= 1
+            PREVIEW_STATS["running"] += 1
+        try:
+            return fn(*args)
+        finally:
+            with _STATS_LOCK:
+                PREVIEW_STATS["running"] -= 1
+                PREVIEW_STATS["completed"] += 1
+
+    def done(_):
+        # Also runs when the awaiting coroutine is cancelled while the job is
+        # still queued: the job is then dropped without task() ever running
+        with _STATS_LOCK:
+            if not started["value"]:
+                PREVIEW_STATS["queued"] -= 1
+
+    future = _get_preview_executor().submit(task)
+    future.add_done_callback(done)
+    return await asyncio.wrap_future(future)
+
+
+def _release_session(session):
+    """Hand the session's in-flight slot to its pending request, or free it."""
+    state = PREVIEW_SESSIONS.get(session)
+    if state is None:
+        return
+    waiter, state["pending"] = state["pending"], None
+    if waiter is not None and not waiter.done():
+        waiter.set_result(True)
+    else:
+        del PREVIEW_SESSIONS[session]
+
+
+async def run_latest_preview_task(session, fn, *args):
+    """run_preview_task with latest-wins coalescing per client session.
+
+    A session has at most one solve in flight and one request pending.
+    A newer request replaces the pending one, which returns None (stale)
+    without being computed. Requests without a session are not coalesced.
+    """
+    if not session:
+        return await run_preview_task(fn, *args)
+
+    state = PREVIEW_SESSIONS.get(session)
+    if state is None:
+        PREVIEW_SESSIONS[session] = {"pending": None}
+    else:
+        # In flight: wait as the pending request, superseding the previous one
+        superseded = state["pending"]
+        if superseded is not None and not superseded.done():
+            superseded.set_result(False)
+        waiter = asyncio.get_running_loop().create_future()
+        state["pending"] = waiter
+        try:
+            if not await waiter:
+                with _STATS_LOCK:
+                    PREVIEW_STATS["stale"] += 1
+                return None
+        except asyncio.CancelledError:
+            # Client went away; pass the slot on if it was already handed to us
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                _release_session(session)
+            elif state.get("pending") is waiter:
+                state["pending"] = None
+            raise
+
+    try:
+        return await run_preview_task(fn, *args)
+    finally:
+        _release_session(session)
+
+
+def _topology_variant(gender):
+    return "genital" if gender >= GENITAL_MIN_GENDER else "base"
+
+
+def _preview_triangles(base_mesh, include_genital):
+    """Triangle vertex indices of the preview face groups (quads split in two)."""
+    tri_indices = []
+    if not base_mesh.face_groups:
+        return np.zeros(0, dtype=np.uint32)
+    for i, group in enumerate(base_mesh.face_groups):
+        g_clean = group.strip()
+        if g_clean not in PREVIEW_FACE_GROUPS:
+            continue
+        if g_clean == "helper-genital" and not include_genital:
+            continue
+
+        v_indices = [item[0] if isinstance(item, (list, tuple)) else item for item in base_mesh.faces[i]]
+        if len(v_indices) == 3:
+            tri_indices.extend([v_indices[0], v_indices[1], v_indices[2]])
+        elif len(v_indices) == 4:
+            tri_indices.extend([v_indices[0], v_indices[1], v_indices[2]])
+            tri_indices.extend([v_indices[0], v_indices[2], v_indices[3]])
+    return np.asarray(tri_indices, dtype=np.uint32)
+
+
+def get_topology(variant):
+    """Static preview data for a variant, built once.
+
+    Returns {"version", "binary", "json", "arrays", "weight_ranges"}: a
+    content hash, the two encoded bodies and the packed arrays.
+    """
+    cached = PREVIEW_TOPOLOGY.get(variant)
+    if cached is not None:
+        return cached
+    with _TOPOLOGY_LOCK:
+        if variant not in PREVIEW_TOPOLOGY:
+            PREVIEW_TOPOLOGY[variant] = _build_topology(variant)
+        return PREVIEW_TOPOLOGY[variant]
+
+
+def _skinning_attributes(skel, vertices):
+    """Per-vertex top-4 bone indices and unorm16 weights, as three.js skinIndex / skinWeight.
+
+    Indices refer to skel.getBones() order (uint8 when there are at most
+    256 bones, else uint16); weights are renormalized so each vertex sums
+    to exactly 65535. Unweighted vertices follow the nearest bone head.
+    """
+    bones = skel.getBones()
+    b_idx, w = skel.vertexWeights.compileData([bone.name for bone in bones], 4)
+    vcount = len(vertices)
+    indices = np.zeros((vcount, 4), dtype=np.uint32)
+    weights = np.zeros((vcount, 4), dtype=np.float32)
+    n = min(vcount, len(b_idx))
+    k = min(4, b_idx.shape[1])
+    indices[:n, :k] = b_idx[:n, :k]
+    weights[:n, :k] = w[:n, :k]
+
+    wsum = weights.sum(axis=1)
+    orphans = np.flatnonzero(wsum <= 0)
+    if len(orphans):
+        heads = np.array([bone.headPos for bone in bones], dtype=np.float32)
+        d2 = ((np.asarray(vertices, dtype=np.float32)[orphans, None, :] - heads[None]) ** 2).sum(axis=2)
+        indices[orphans] = 0
+        indices[orphans, 0] = d2.argmin(axis=1)
+        weights[orphans] = 0
+        weights[orphans, 0] = 1
+        wsum[orphans] = 1
+
+    q = np.rint(weights / wsum[:, None] * 65535).astype(np.int64)
+    q[:, 0] += 65535 - q.sum(axis=1)  # Rounding remainder to the strongest influence
+    return indices, q.astype(np.uint16), "uint8" if len(bones) <= 256 else "uint16"
+
+
+def _build_topology(variant):
+    from ..nodes.pose_render import POSE_STUDIO_CACHE, _ensure_data_loaded
+    _ensure_data_loaded()
+    base_mesh = POSE_STUDIO_CACHE['base_mesh']
+    skel = POSE_STUDIO_CACHE.get('skeleton')
+
+    indices = _preview_triangles(base_mesh, variant == "genital")
+    uvs = base_mesh.vertex_uvs if hasattr(base_mesh, 'vertex_uvs') else np.zeros((0, 2), dtype=np.float32)
+    bones = []
+    weights = {}
+    skin = None
+    if skel:
+        bones = [{"name": bone.name, "parent": bone.parent.name if bone.parent else None} for bone in skel.getBones()]
+        if skel.vertexWeights:
+            weights = {name: (np.asarray(idx), np.asarray(vals)) for name, (idx, vals) in skel.vertexWeights.data.items()}
+            skin = _skinning_attributes(skel, base_mesh.vertices)
+
+    # Binary: per-bone weights are [start, count] slices of two shared buffers
+    # (full update_preview responses of older clients)
+    arrays = {"uvs": (uvs, "float32"), "indices": (indices, "uint32")}
+    weight_ranges = {}
+    start = 0
+    for name, (idx, _) in weights.items():
+        weight_ranges[name] = [start, len(idx)]
+        start += len(idx)
+    if weights:
+        arrays["weight_indices"] = (np.concatenate([idx for idx, _ in weights.values()]), "uint32")
+        arrays["weight_values"] = (np.concatenate([vals for _, vals in weights.values()]), "float32")
+
+    # Topology endpoint: ready-made V x 4 skin attributes instead of per-bone lists
+    topology_arrays = {"uvs": (uvs, "float32"), "indices": (indices, "uint32")}
+    if skin is not None:
+        skin_indices, skin_weights, index_dtype = skin
+        topology_arrays["skin_indices"] = (skin_indices, index_dtype)
+        topology_arrays["skin_weights"] = (skin_weights, "uint16")
+    binary = pack_arrays({"status": "success", "variant": variant, "bones": bones}, topology_arrays)
+
+    version = hashlib.sha256(binary).hexdigest()[:16]
+    json_body = json.dumps({
+        "status": "success",
+        "variant": variant,
+        "version": version,
+        "bones": bones,
+        "uvs": uvs.flatten().tolist(),
+        "indices": indices.tolist(),
+        "weights": {name: {"indices": idx.tolist(), "weights": vals.tolist()} for name, (idx, vals) in weights.items()},
+    }).encode("utf-8")
+
+    return {"version": version, "binary": binary, "json": json_body, "arrays": arrays, "weight_ranges": weight_ranges}
+
+
+def solve_preview(params):
+    """Solve the mesh and joints for slider params (the update_preview JSON body).
+
+    Returns (vertices, bones, variant): (V, 3) positions, per-bone dicts
+    with the morph-dependent joint data, and the topology variant.
+    """
+    from ..CharacterData.mh_parser import HumanSolver
+    from ..nodes.pose_render import POSE_STUDIO_CACHE, _ensure_data_loaded
+
+    age = float(params.get('age', 25.0))
+    gender = float(params.get('gender', 0.5))
+    weight = float(params.get('weight', 0.5))
+    muscle = float(params.get('muscle', 0.5))
+    height = float(params.get('height', 0.5))
+    breast_size = float(params.get('breast_size', 0.5))
+    firmness = float(params.get('firmness', 0.5))
+    penis_len = float(params.get('penis_len', 0.5))
+    penis_circ = float(params.get('penis_circ', 0.5))
+    penis_test = float(params.get('penis_test', 0.5))
+
+    # Normalize age
+    mh_age = (age - 1.0) / (90.0 - 1.0)
+    mh_age = max(0.0, min(1.0, mh_age))
+
+    _ensure_data_loaded()
+
+    solver = HumanSolver()
+    factors = solver.calculate_factors(mh_age, gender, weight, muscle, height, breast_size, firmness, penis_len, penis_circ, penis_test)
+    new_verts = solver.solve_mesh(POSE_STUDIO_CACHE['base_mesh'], POSE_STUDIO_CACHE['targets'], factors)
+
+    bones_data = []
+    skel = POSE_STUDIO_CACHE.get('skeleton')
+    if skel:
+        class MeshWrapper:
+            def __init__(self, verts):
+                self.vertices = verts
+        # Copy: fitting modifies joint positions and solves run concurrently
+        skel = skel.copy()
+        skel.updateJointPositions(MeshWrapper(new_verts))
+
+        for bone in skel.getBones():
+            headPos = bone.headPos.tolist() if hasattr(bone.headPos, 'tolist') else list(bone.headPos)
+            tailPos = bone.tailPos.tolist() if hasattr(bone.tailPos, 'tolist') else list(bone.tailPos)
+
+            restMatrix = None
+            if bone.matRestGlobal is not None:
+                restMatrix = bone.matRestGlobal.flatten().tolist()
+
+            bones_data.append({
+                "name": bone.name,
+                "headPos": headPos,
+                "tailPos": tailPos,
+                "parent": bone.parent.name if bone.parent else None,
+                "length": float(bone.length) if hasattr(bone, 'length') else 0.0,
+                "restMatrix": restMatrix
+            })
+
+    return new_verts, bones_data, _topology_variant(gender)
+
+
+def _quantize(verts, center, scale):
+    """Positions as int16 steps of scale around center, or None if outside the box."""
+    q = np.rint((verts - center) / scale)
+    if np.abs(q).max() > 32767:
+        return None
+    return q.astype(np.int16)
+
+
+def encode_vertex_update(session, verts, base_version):
+    """Quantized vertex update relative to a version the client acknowledged.
+
+    Positions are int16 steps inside a box around the mesh chosen at the
+    last full frame (position = center + q * scale). If the client's base
+    version is still known and the mesh fits the box, only the vertices
+    whose quantized position changed are sent (all positions when most
+    moved, "base" is then None); otherwise a full frame starts a new box.
+    Returns (header fields, arrays for pack_arrays).
+    """
+    verts = np.asarray(verts, dtype=np.float32)
+    with _VERTEX_SESSIONS_LOCK:
+        state = VERTEX_SESSIONS.get(session)
+        if state is not None:
+            VERTEX_SESSIONS.move_to_end(session)
+
+        base = state["frames"].get(base_version) if state is not None else None
+        q = _quantize(verts, state["center"], state["scale"]) if base is not None else None
+        if q is None or q.shape != base.shape:
+            # Full resync with a box fitted to this mesh
+            lo, hi = verts.min(0), verts.max(0)
+            center = (lo + hi) / 2
+            scale = np.maximum((hi - lo) / 2 * (1 + VERTEX_BOX_MARGIN), 1e-6) / 32767
+            q = _quantize(verts, center, scale)
+            state = {"center": center, "scale": scale, "version": next(_VERTEX_VERSIONS), "frames": OrderedDict()}
+            VERTEX_SESSIONS[session] = state
+            while len(VERTEX_SESSIONS) > VERTEX_MAX_SESSIONS:
+                VERTEX_SESSIONS.popitem(last=False)
+            base_version = None
+            arrays = {"positions": (q, "int16")}
+        else:
+            state["version"] = next(_VERTEX_VERSIONS)
+            changed = np.flatnonzero((q != base).any(axis=1))
+            if len(changed) * 10 < q.size * 2:
+                arrays = {"changed": (changed, "uint32"), "positions": (q[changed], "int16")}
+            else:
+                # Most vertices moved (e.g. weight): all positions are smaller than index + position pairs
+                base_version = None
+                arrays = {"positions": (q, "int16")}
+
+        version = state["version"]
+        state["frames"][version] = q
+        while len(state["frames"]) > VERTEX_HISTORY:
+            state["frames"].popitem(last=False)
+
+    header = {"version": version, "base": base_version,
+              "center": state["center"].tolist(), "scale": state["scale"].tolist()}
+    return header, arrays
+
+
+def build_preview_response(data, binary):
+    """Solve and encode an update_preview request. Returns (body, content_type).
+
+    With "parts": "dynamic" in data only the morph-dependent data is
+    returned (vertices and bones with joint positions) plus the topology
+    {"variant", "version"} to combine it with. Otherwise the response
+    also contains the topology (uvs, indices, weights) as before.
+    Binary dynamic requests with "encoding": "delta" and a session get
+    quantized vertices (see encode_vertex_update) relative to the
+    client's "base_version".
+    """
+    new_verts, bones_data, variant = solve_preview(data)
+    topology = get_topology(variant)
+
+    if data.get("parts") == "dynamic":
+        header = {"status": "success", "bones": bones_data,
+                  "topology": {"variant": variant, "version": topology["version"]}}
+        if binary:
+            if data.get("encoding") == "delta" and data.get("session"):
+                header["vertex_update"], arrays = encode_vertex_update(data["session"], new_verts, data.get("base_version"))
+                return pack_arrays(header, arrays), BINARY_CONTENT_TYPE
+            return pack_arrays(header, {"vertices": (new_verts, "float32")}), BINARY_CONTENT_TYPE
+        return json.dumps({**header, "vertices": new_verts.flatten().tolist()}).encode("utf-8"), "application/json"
+
+    # Full response for older clients
+    if binary:
+        body = pack_arrays({"status": "success", "bones": bones_data, "weight_ranges": topology["weight_ranges"]},
+                           {"vertices": (new_verts, "float32"), **topology["arrays"]})
+        return body, BINARY_CONTENT_TYPE
+
+    static = json.loads(topology["json"])
+    return json.dumps({
+        "status": "success",
+        "vertices": new_verts.flatten().tolist(),
+        "uvs": static["uvs"],
+        "indices": static["indices"],
+        "normals": [],
+        "bones": bones_data,
+        "weights": static["weights"]
+    }).encode("utf-8"), "application/json"
+
+
+def _vertex_version(session):
+    with _VERTEX_SESSIONS_LOCK:
+        state = VERTEX_SESSIONS.get(session)
+        return state["version"] if state is not None else None
+
+
+async def _ws_send(ws, send, data):
+    """Send on a websocket; False once it is closed.
+
+    A socket closing mid-send raises ConnectionResetError, RuntimeError or
+    ClientConnectionResetError depending on the aiohttp version.
+    """
+    if ws.closed:
+        return False
+    try:
+        await send(data)
+    except (ConnectionError, RuntimeError, ClientError):
+        return False
+    return True
+
+
+async def preview_stream(request):
+    """GET /vnccs/character_studio/preview_stream - Websocket for live morph preview.
+
+    The client sends slider states as JSON text messages (the update_preview
+    body); the server answers with binary
+    update_preview frames (parts=dynamic) at most PREVIEW_STREAM_FPS times
+    per second. States that arrive while a frame is being solved or
+    throttled replace each other, so only the newest is solved. Frames are
+    delta-encoded against the previous frame on this socket, which the
+    client applies in order; {"resync": true} requests a full frame.
+    """
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    loop = asyncio.get_running_loop()
+    session = f"stream-{uuid.uuid4().hex}"
+    latest = {"state": None, "base_version": None, "resync": False}
+    wake = asyncio.Event()
+
+    async def pump():
+        last_sent = 0.0
+        while True:
+            await wake.wait()
+            # Throttle; states arriving meanwhile replace the one waiting
+            await asyncio.sleep(max(0.0, last_sent + 1.0 / PREVIEW_STREAM_FPS - loop.time()))
+            wake.clear()
+            state, latest["state"] = latest["state"], None
+            if state is None:
+                continue
+            if latest["resync"]:
+                latest["resync"], latest["base_version"] = False, None
+            state = {**state, "parts": "dynamic", "session": session, "encoding": "delta",
+                     "base_version": latest["base_version"]}
+            try:
+                body, _ = await run_preview_task(build_preview_response, state, True)
+            except PreviewBusy:
+                if latest["state"] is None:
+                    latest["state"] = state
+                wake.set()
+                last_sent = loop.time()  # Retry after one frame interval
+                continue
+            except Exception as e:
+                if not await _ws_send(ws, ws.send_json, {"status": "error", "error": str(e)}):
+                    return
+                continue
+            latest["base_version"] = _vertex_version(session)
+            # Waits for the socket to drain (backpressure)
+            if not await _ws_send(ws, ws.send_bytes, body):
+                return
+            last_sent = loop.time()
+
+    with _STATS_LOCK:
+        PREVIEW_STATS["streams"] += 1
+    task = asyncio.create_task(pump())
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                try:
+                    data = json.loads(msg.data)
+                except ValueError:
+                    continue
+                if data.pop("resync", False):
+                    latest["resync"] = True
+                if latest["state"] is not None:
+                    with _STATS_LOCK:
+                        PREVIEW_STATS["dropped"] += 1
+                latest["state"] = data
+                wake.set()
+            elif msg.type == WSMsgType.ERROR:
+                break
+    finally:
+        task.cancel()
+        with _STATS_LOCK:
+            PREVIEW_STATS["streams"] -= 1
+        with _VERTEX_SESSIONS_LOCK:
+            VERTEX_SESSIONS.pop(session, None)
+    return ws
+
+
+def _busy_response():
+    return web.json_response({"error": "Preview queue is full"}, status=503, headers={"Retry-After": "1"})
+
+
+async def update_preview(request):
+    """POST /vnccs/character_studio/update_preview - Solved mesh for the slider values.
+
+    Requests carrying the same "session" are coalesced: ones superseded by
+    a newer request before they started answer {"status": "stale"}.
+    """
+    try:
+        data = await request.json()
+        result = await run_latest_preview_task(data.get("session"), build_preview_response, data, wants_binary(request))
+        if result is None:
+            return web.json_response({"status": "stale"})
+        body, content_type = result
+        return await compressed_response(request, body, content_type)
+    except PreviewBusy:
+        return _busy_response()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return web.json_response({"error": str(e)}, status=500)
+
+
+async def get_topology_request(request):
+    """GET /vnccs/character_studio/topology?variant=base|genital - Static preview data.
+
+    Revalidated by the browser with If-None-Match; unchanged data is a 304.
+    """
+    variant = request.query.get("variant", "base")
+    if variant not in ("base", "genital"):
+        return web.json_response({"error": f"Unknown variant: {variant}"}, status=400)
+    try:
+        topology = await run_preview_task(get_topology, variant)
+    except PreviewBusy:
+        return _busy_response()
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
+    binary = wants_binary(request)
+    if binary:
+        body, content_type = topology["binary"], BINARY_CONTENT_TYPE
+    else:
+        body, content_type = topology["json"], "application/json"
+    # One validator per representation: format and content-coding
+    coding = response_encoding(request, body, content_type)
+    etag = f'"{topology["version"]}-{"bin" if binary else "json"}{"-" + coding if coding else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=headers)
+    # Same bytes for every request of a version: compress once
+    cache_key = ("topology", variant, etag)
+    return await compressed_response(request, body, content_type, headers=headers, cache_key=cache_key)
+
+
+async def get_preview_stats(request):
+    """GET /vnccs/character_studio/preview_stats - Preview pool load.
+
+    queued: requests waiting for a worker, running: solves in progress,
+    peak_queued: highest queue depth seen, completed / rejected / stale
+    (superseded by a newer request of the same session) / dropped (stream
+    states replaced before being solved): totals, sessions: clients with a
+    solve in flight, streams: open preview websockets.
+    """
+    with _STATS_LOCK:
+        stats = dict(PREVIEW_STATS)
+    return web.json_response({**stats, "sessions": len(PREVIEW_SESSIONS),
+                              "workers": PREVIEW_WORKERS, "max_queue": PREVIEW_MAX_QUEUE})
+
+
+def register_routes(routes):
+    """Register character preview API routes on a RouteTableDef.
+
+    Pass PromptServer.instance.routes: ComfyUI serves its routes both as
+    given and under /api, which api.fetchApi() and api.apiURL() use.
+    """
+    routes.post("/vnccs/character_studio/update_preview")(update_preview)
+    routes.get("/vnccs/character_studio/topology")(get_topology_request)
+    routes.get("/vnccs/character_studio/preview_stats")(get_preview_stats)
+    routes.get("/vnccs/character_studio/preview_stream")(preview_stream)
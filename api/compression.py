@@ -0,0 +1,164 @@
+"""Accept-Encoding negotiation for the VNCCS API responses.
+
+Bodies of at least MIN_COMPRESS_BYTES are compressed with the best coding
+the client accepts: zstd or brotli when their Python packages are
+installed, else gzip or deflate. Compression runs in a thread, not on the
+event loop. Payloads that only change with their inputs (static topology,
+pose library entries) pass a cache key, and their compressed forms are
+kept in a small LRU so they are compressed once.
+"""
+
+import asyncio
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from aiohttp import web
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_COMPRESS_BYTES = 1024
+
+# Already compressed formats are sent as they are
+INCOMPRESSIBLE_TYPES = ("image/png", "image/webp", "image/jpeg")
+
+# Compressed cacheable payloads: {(cache_key, coding): bytes}, LRU by total size
+COMPRESSED_CACHE = OrderedDict()
+COMPRESSED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_CACHE_LOCK = threading.Lock()
+_CACHE_SIZE = {"bytes": 0}
+
+
+def _server_codings():
+    """Supported codings, most preferred first."""
+    codings = []
+    if zstandard is not None:
+        codings.append("zstd")
+    if brotli is not None:
+        codings.append("br")
+    return codings + ["gzip", "deflate"]
+
+
+def choose_encoding(request):
+    """Best coding allowed by the request's Accept-Encoding, or None."""
+    accepted = {}
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    for coding in _server_codings():
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body, coding, thorough=False):
+    """Compress body; thorough spends more time for payloads that are cached."""
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=19 if thorough else 3).compress(body)
+    if coding == "br":
+        return brotli.compress(body, quality=11 if thorough else 4)
+    level = 9 if thorough else 5
+    if coding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = zlib.compressobj(level)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _cached_compress(body, coding, cache_key):
+    key = (cache_key, coding)
+    with _CACHE_LOCK:
+        data = COMPRESSED_CACHE.get(key)
+        if data is not None:
+            COMPRESSED_CACHE.move_to_end(key)
+            return data
+
+    data = compress(body, coding, thorough=True)
+    with _CACHE_LOCK:
+        if key not in COMPRESSED_CACHE:
+            COMPRESSED_CACHE[key] = data
+            _CACHE_SIZE["bytes"] += len(data)
+            while _CACHE_SIZE["bytes"] > COMPRESSED_CACHE_MAX_BYTES and len(COMPRESSED_CACHE) > 1:
+                _, evicted = COMPRESSED_CACHE.popitem(last=False)
+                _CACHE_SIZE["bytes"] -= len(evicted)
+    return data
+
+
+def _comfy_compresses(content_type):
+    """ComfyUI's own middleware already gzips JSON/text when started with --enable-compress-response-body."""
+    if content_type not in ("application/json", "text/plain"):
+        return False
+    try:
+        from comfy.cli_args import args
+        return bool(getattr(args, "enable_compress_response_body", False))
+    except Exception:
+        return False
+
+
+def _compressible(body, content_type):
+    return (len(body) >= MIN_COMPRESS_BYTES and content_type not in INCOMPRESSIBLE_TYPES
+            and not _comfy_compresses(content_type))
+
+
+def response_encoding(request, body, content_type):
+    """Coding compressed_response will use for this body, or None (identity).
+
+    Lets handlers put the coding into validators: each content-coding of a
+    resource needs its own ETag (RFC 9110).
+    """
+    return choose_encoding(request) if _compressible(body, content_type) else None
+
+
+def _add_vary(headers, field):
+    vary = headers.get("Vary")
+    headers["Vary"] = f"{vary}, {field}" if vary else field
+
+
+async def compressed_response(request, body, content_type, headers=None, cache_key=None, status=200):
+    """web.Response with body compressed for the client when worthwhile.
+
+    cache_key identifies immutable content (it must change whenever body
+    does); its compressed forms are cached.
+    """
+    headers = dict(headers or {})
+    if not _compressible(body, content_type):
+        return web.Response(body=body, status=status, content_type=content_type, headers=headers)
+
+    # Every variant, identity included, depends on Accept-Encoding
+    if "Accept-Encoding" not in headers.get("Vary", ""):
+        _add_vary(headers, "Accept-Encoding")
+    coding = choose_encoding(request)
+    if coding is None:
+        return web.Response(body=body, status=status, content_type=content_type, headers=headers)
+
+    loop = asyncio.get_running_loop()
+    if cache_key is not None:
+        data = await loop.run_in_executor(None, _cached_compress, body, coding, cache_key)
+    else:
+        data = await loop.run_in_executor(None, compress, body, coding)
+    headers["Content-Encoding"] = coding
+    return web.Response(body=data, status=status, content_type=content_type, headers=headers)
+
+
+async def compressed_json_response(request, data, cache_key=None, status=200):
+    """compressed_response for a JSON-serializable object (dumped off the event loop)."""
+    body = await asyncio.get_running_loop().run_in_executor(None, lambda: json.dumps(data).encode("utf-8"))
+    return await compressed_response(request, body, "application/json", cache_key=cache_key, status=status)
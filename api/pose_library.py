@@ -1,8 +1,56 @@
 import os
 import json
 import base64
+import asyncio
+import threading
 from aiohttp import web
 
+from ..nodes.pose_capture_store import (get_capture_store, is_capture_hash, DEFAULT_GC_MIN_AGE_HOURS,
+                                        MAX_CAPTURE_BYTES)
+from .compression import compressed_json_response
+
+# Executions waiting for a live pose sync, by node id:
+# {"event": Event, "ack": Event, "data": dict}
+_PENDING_SYNCS = {}
+_PENDING_SYNCS_LOCK = threading.Lock()
+
+
+def begin_pose_sync(node_id):
+    """Register a waiter for node_id. Call before sending the sync request."""
+    waiter = {"event": threading.Event(), "ack": threading.Event(), "data": None}
+    with _PENDING_SYNCS_LOCK:
+        _PENDING_SYNCS[str(node_id)] = waiter
+    return waiter
+
+
+def end_pose_sync(node_id, waiter):
+    """Unregister a waiter created by begin_pose_sync."""
+    with _PENDING_SYNCS_LOCK:
+        if _PENDING_SYNCS.get(str(node_id)) is waiter:
+            del _PENDING_SYNCS[str(node_id)]
+
+
+def ack_pose_sync(node_id):
+    """Mark that a widget for node_id received the sync request. Returns False if none waits."""
+    with _PENDING_SYNCS_LOCK:
+        waiter = _PENDING_SYNCS.get(str(node_id))
+    if waiter is None:
+        return False
+    waiter["ack"].set()
+    return True
+
+
+def deliver_pose_sync(node_id, data):
+    """Hand a sync payload to the waiting execution. Returns False if none waits."""
+    with _PENDING_SYNCS_LOCK:
+        waiter = _PENDING_SYNCS.get(str(node_id))
+    if waiter is None:
+        return False
+    waiter["data"] = data
+    waiter["ack"].set()
+    waiter["event"].set()
+    return True
+
 # Base path for PoseLibrary
 def get_library_path():
     """Returns the path to PoseLibrary folder, creating it if needed."""
@@ -11,11 +59,20 @@ def get_library_path():
     os.makedirs(lib_path, exist_ok=True)
     return lib_path
 
+def _file_stamp(path):
+    """(mtime_ns, size) of a file, or None; identifies its content for the compression cache."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 async def list_poses(request):
     """GET /vnccs/pose_library/list - Returns list of saved poses."""
     full_details = request.query.get("full") == "true"
     lib_path = get_library_path()
     poses = []
+    stamps = []
     
     # Optimistic listing: only read file stats if possible
     try:
@@ -31,6 +88,7 @@ async def list_poses(request):
             
             pose_data = None
             if full_details:
+                stamps.append((filename, _file_stamp(os.path.join(lib_path, filename)), has_preview))
                 try:
                     with open(os.path.join(lib_path, filename), "r") as f:
                         pose_data = json.load(f)
@@ -43,7 +101,9 @@ async def list_poses(request):
                 "data": pose_data
             })
     
-    return web.json_response({"poses": sorted(poses, key=lambda x: x["name"])})
+    # The full listing embeds every pose file, so its compressed form is cached per library state
+    cache_key = ("pose_list", lib_path, tuple(sorted(stamps))) if full_details else None
+    return await compressed_json_response(request, {"poses": sorted(poses, key=lambda x: x["name"])}, cache_key)
 
 async def get_pose(request):
     """GET /vnccs/pose_library/get/{name} - Returns pose data and preview."""
@@ -57,6 +117,7 @@ async def get_pose(request):
     
     if not os.path.exists(pose_path):
         return web.json_response({"error": "Pose not found"}, status=404)
+    cache_key = ("pose", pose_path, _file_stamp(pose_path), _file_stamp(preview_path))
     
     with open(pose_path, "r") as f:
         pose_data = json.load(f)
@@ -66,11 +127,11 @@ async def get_pose(request):
         with open(preview_path, "rb") as f:
             preview_b64 = base64.b64encode(f.read()).decode("utf-8")
     
-    return web.json_response({
+    return await compressed_json_response(request, {
         "name": name,
         "pose": pose_data,
         "preview": preview_b64
-    })
+    }, cache_key)
 
 async def save_pose(request):
     """POST /vnccs/pose_library/save - Saves a pose with optional preview."""
@@ -153,7 +214,12 @@ async def upload_pose_sync(request):
         node_id = data.get("node_id")
         if not node_id:
              return web.json_response({"error": "No node_id"}, status=400)
-             
+        
+        # Waiting execution in this process: hand over directly, no disk
+        if deliver_pose_sync(node_id, data):
+            return web.json_response({"status": "ok"})
+        
+        # Fallback for executions that poll the temp file
         import folder_paths
         temp_dir = folder_paths.get_temp_directory()
         # Note: we use 'debug' in the filename for backwards compatibility with the backend check
@@ -166,6 +232,145 @@ async def upload_pose_sync(request):
     except Exception as e:
         return web.json_response({"error": str(e)}, status=500)
 
+def _blob_to_data_url(blob):
+    """Encode a binary capture as a data URL for the JSON temp-file fallback."""
+    fmt = blob.get("format", "png")
+    payload = blob["data"]
+    if fmt in ("rgba", "rgb"):
+        from io import BytesIO
+        from PIL import Image
+        img = Image.frombuffer(fmt.upper(), (int(blob["width"]), int(blob["height"])), payload, "raw", fmt.upper(), 0, 1)
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        payload, fmt = buf.getvalue(), "png"
+    return f"data:image/{fmt};base64,{base64.b64encode(payload).decode('ascii')}"
+
+def _store_blobs(blobs):
+    """Put the PNG/WebP blobs in the capture store. Returns a hash (or None) per blob."""
+    store = get_capture_store()
+    hashes = []
+    for blob in blobs:
+        try:
+            hashes.append(store.put(blob["data"]) if blob["format"] in ("png", "webp") else None)
+        except ValueError:
+            hashes.append(None)
+    return hashes
+
+async def upload_pose_sync_binary(request):
+    """POST /vnccs/pose_sync/upload_capture_binary - Synchronized capture as multipart.
+
+    Parts: "meta" (the pose_data JSON with node_id, without captured_images)
+    and one "image" part per pose, in order. Image parts are PNG or WebP
+    files, or raw top-down pixels described by meta["captures"][i]
+    ({"format": "rgba" | "rgb", "width", "height"}).
+    """
+    try:
+        reader = await request.multipart()
+        data = None
+        blobs = []
+        while True:
+            part = await reader.next()
+            if part is None:
+                break
+            if part.name == "meta":
+                data = json.loads(await part.text())
+            elif part.name == "image":
+                content_type = part.headers.get("Content-Type", "")
+                fmt = "webp" if "webp" in content_type else "png"
+                blobs.append({"format": fmt, "data": bytes(await part.read())})
+        
+        if not isinstance(data, dict) or not data.get("node_id"):
+            return web.json_response({"error": "No node_id"}, status=400)
+        
+        # Raw pixel parts are described in the meta
+        for blob, desc in zip(blobs, data.pop("captures", None) or []):
+            if isinstance(desc, dict) and desc.get("format") in ("rgba", "rgb"):
+                blob.update(format=desc["format"], width=desc.get("width"), height=desc.get("height"))
+        data["captured_images"] = []
+        data["captured_blobs"] = blobs
+        node_id = data["node_id"]
+        
+        # Keep encoded captures in the store so the widget can save hashes only
+        # (hashing and writing run off the event loop)
+        hashes = await asyncio.get_running_loop().run_in_executor(None, _store_blobs, blobs)
+        data["capture_hashes"] = hashes
+        
+        # Waiting execution in this process: hand over the bytes directly
+        if deliver_pose_sync(node_id, data):
+            return web.json_response({"status": "ok", "hashes": hashes})
+        
+        # Fallback for executions that poll the temp file (JSON, so base64 again)
+        data["captured_images"] = [_blob_to_data_url(blob) for blob in data.pop("captured_blobs")]
+        import folder_paths
+        filepath = os.path.join(folder_paths.get_temp_directory(), f"vnccs_debug_{node_id}.json")
+        with open(filepath, "w") as f:
+            json.dump(data, f)
+        
+        return web.json_response({"status": "ok", "hashes": hashes})
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
+async def ack_pose_sync_request(request):
+    """POST /vnccs/pose_sync/ack - A widget will answer the sync request for node_id."""
+    try:
+        data = await request.json()
+        node_id = data.get("node_id")
+        if node_id is None:
+            return web.json_response({"error": "No node_id"}, status=400)
+        return web.json_response({"status": "ok" if ack_pose_sync(node_id) else "not_waiting"})
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
+async def upload_capture(request):
+    """POST /vnccs/pose_captures - Store one PNG/WebP capture (raw body), returns its hash.
+
+    Bodies over MAX_CAPTURE_BYTES get 413, other content than a PNG or WebP
+    image 400; the format comes from the file signature, not Content-Type.
+    """
+    try:
+        if (request.content_length or 0) > MAX_CAPTURE_BYTES:
+            return web.json_response({"error": "Capture too large"}, status=413)
+        data = bytearray()
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            data += chunk
+            if len(data) > MAX_CAPTURE_BYTES:
+                return web.json_response({"error": "Capture too large"}, status=413)
+        if not data:
+            return web.json_response({"error": "Empty capture"}, status=400)
+        digest = await asyncio.get_running_loop().run_in_executor(None, get_capture_store().put, bytes(data))
+        return web.json_response({"hash": digest})
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
+async def get_capture(request):
+    """GET /vnccs/pose_captures/{hash} - Stored capture (immutable, cached by the browser)."""
+    found = get_capture_store().find(request.match_info.get("hash", ""))
+    if found is None:
+        return web.Response(status=404)
+    path, fmt = found
+    return web.FileResponse(path, headers={
+        "Content-Type": f"image/{fmt}",
+        "Cache-Control": "public, max-age=31536000, immutable",
+    })
+
+async def collect_captures(request):
+    """POST /vnccs/pose_captures/gc - Delete unreferenced captures.
+
+    Body (optional): {"keep": [hashes still in use], "min_age_hours": N}.
+    Hashes found in saved workflows are always kept.
+    """
+    try:
+        body = await request.json() if request.can_read_body else {}
+        keep = [h for h in body.get("keep", []) if is_capture_hash(h)]
+        min_age = float(body.get("min_age_hours", DEFAULT_GC_MIN_AGE_HOURS))
+        removed, freed = await asyncio.get_running_loop().run_in_executor(
+            None, get_capture_store().collect_garbage, keep, min_age)
+        return web.json_response({"status": "ok", "removed": removed, "freed_bytes": freed})
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
 def register_routes(app):
     """Register Pose Library API routes."""
     app.router.add_get("/vnccs/pose_library/list", list_poses)
@@ -174,4 +379,9 @@ def register_routes(app):
     app.router.add_delete("/vnccs/pose_library/delete/{name}", delete_pose)
     app.router.add_get("/vnccs/pose_library/preview/{name}", get_preview)
     app.router.add_post("/vnccs/pose_sync/upload_capture", upload_pose_sync)
+    app.router.add_post("/vnccs/pose_sync/upload_capture_binary", upload_pose_sync_binary)
+    app.router.add_post("/vnccs/pose_sync/ack", ack_pose_sync_request)
+    app.router.add_post("/vnccs/pose_captures", upload_capture)
+    app.router.add_post("/vnccs/pose_captures/gc", collect_captures)
+    app.router.add_get("/vnccs/pose_captures/{hash}", get_capture)
     app.router.add_post("/vnccs/debug/upload_capture", upload_pose_sync)  # Aliased for backward compatibility
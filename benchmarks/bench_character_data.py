@@ -0,0 +1,161 @@
+"""Micro-benchmarks for CharacterData loading and skinning.
+
+Run from the repository root:
+    python benchmarks/bench_character_data.py
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from CharacterData import matrix
+from CharacterData.mh_skeleton import Skeleton, VertexBoneWeights
+from CharacterData.obj_loader import load_obj
+
+MH_DATA = os.path.join(ROOT, "CharacterData", "makehuman", "makehuman", "data")
+RIGS = os.path.join(MH_DATA, "rigs")
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Reference implementations: the per-vertex Python loops that
+# VertexBoneWeights and Skeleton._merge_weights replaced, kept to time the
+# vectorized code against them.
+
+def reference_build_weights(vertexWeightsDict, vcount, threshold=1e-4):
+    """Per-bone loop version of VertexBoneWeights._build_vertex_weights_data (without the root fallback)."""
+    wtot = np.zeros(vcount, np.float32)
+    for vgroup in list(vertexWeightsDict.values()):
+        for item in vgroup:
+            vn, w = item
+            wtot[vn] += w
+
+    boneWeights = OrderedDict()
+    for bname, vgroup in list(vertexWeightsDict.items()):
+        if len(vgroup) == 0:
+            continue
+        weights = []
+        verts = []
+        v_lookup = {}
+        for vn, w in vgroup:
+            if vn in v_lookup:
+                v_idx = v_lookup[vn]
+                weights[v_idx] += w / wtot[vn]
+            else:
+                v_lookup[vn] = len(verts)
+                verts.append(vn)
+                weights.append(w / wtot[vn])
+        verts = np.asarray(verts, dtype=np.uint32)
+        weights = np.asarray(weights, np.float32)
+
+        i_s = np.argsort(verts)
+        verts = verts[i_s]
+        weights = weights[i_s]
+
+        i_s = np.argwhere(weights > threshold)[:, 0]
+        boneWeights[bname] = (verts[i_s], weights[i_s])
+    return boneWeights
+
+
+def reference_merge_weights(parts):
+    """Dict-per-vertex version of Skeleton._merge_weights."""
+    combined = {}
+    for vs, ws in parts:
+        for i, v in enumerate(vs):
+            if v not in combined:
+                combined[v] = 0.0
+            combined[v] += ws[i]
+    if not combined:
+        return None
+    vs = np.array(list(combined.keys()), dtype=np.uint32)
+    ws = np.array(list(combined.values()), dtype=np.float32)
+    idx_sorted = np.argsort(vs)
+    return vs[idx_sorted], ws[idx_sorted]
+
+
+def _same_weights(a, b):
+    return list(a) == list(b) and all(
+        np.array_equal(a[k][0], b[k][0]) and np.allclose(a[k][1], b[k][1], atol=1e-6) for k in a)
+
+
+def bench_weights_load(mesh):
+    """Time weight construction and retargeting against the reference loops (JSON parsing excluded)."""
+    with open(os.path.join(RIGS, "default_weights.mhw"), "r", encoding="utf-8") as f:
+        weights = json.load(f, object_pairs_hook=OrderedDict)["weights"]
+    count = len(mesh.vertices)
+
+    t_build = _best_of(lambda: VertexBoneWeights(weights, count, "root"))
+    t_build_ref = _best_of(lambda: reference_build_weights(weights, count))
+    built = VertexBoneWeights(weights, count, "root").data
+    same_build = _same_weights(reference_build_weights(weights, count), OrderedDict(
+        (k, v) for k, v in built.items() if k in weights and len(weights[k]) > 0))
+
+    skel = Skeleton()
+    skel.fromFile(os.path.join(RIGS, "game_engine.mhskel"), mesh)
+
+    raw = VertexBoneWeights(weights, count, skel.roots[0].name)
+    raw_data = raw.data
+
+    def retarget():
+        raw._data = raw_data
+        skel.vertexWeights = raw
+        skel._retarget_weights()
+        return skel.vertexWeights.data
+
+    t_retarget = _best_of(retarget)
+    retargeted = retarget()
+    skel._merge_weights = reference_merge_weights  # Instance attribute shadows the staticmethod
+    t_retarget_ref = _best_of(retarget)
+    same_retarget = _same_weights(retarget(), retargeted)
+    del skel._merge_weights
+    retarget()
+
+    print(f"VertexBoneWeights build : {t_build * 1000:8.2f} ms  (loop {t_build_ref * 1000:8.2f} ms, "
+          f"{t_build_ref / t_build:.1f}x, identical: {same_build})")
+    print(f"Skeleton retarget       : {t_retarget * 1000:8.2f} ms  (loop {t_retarget_ref * 1000:8.2f} ms, "
+          f"{t_retarget_ref / t_retarget:.1f}x, identical: {same_retarget})")
+    return skel
+
+
+def bench_skinning(mesh, skel):
+    """Time linear blend vs dual quaternion skinning on a library pose."""
+    pose_path = sorted(glob.glob(os.path.join(ROOT, "PoseLibrary", "*.json")))[0]
+    with open(pose_path, "r") as f:
+        bones = json.load(f).get("bones", {})
+
+    for bone_name, (rx, ry, rz) in bones.items():
+        bone = skel.getBone(bone_name)
+        if bone:
+            # matrix.rot* take degrees
+            bone.matPose = np.asarray(np.dot(matrix.rotz(rz), np.dot(matrix.roty(ry), matrix.rotx(rx))))
+    for bone in skel.boneslist:
+        bone.update()
+
+    verts = mesh.vertices
+    skel.skinMesh(verts)  # Warm up compiled weights
+    t_lbs = _best_of(lambda: skel.skinMesh(verts), repeat=20)
+    t_dqs = _best_of(lambda: skel.skinMesh(verts, dualQuaternion=True), repeat=20)
+
+    print(f"Skinning LBS ({os.path.basename(pose_path)}): {t_lbs * 1000:8.2f} ms")
+    print(f"Skinning DQS ({os.path.basename(pose_path)}): {t_dqs * 1000:8.2f} ms  ({t_dqs / t_lbs:.2f}x LBS)")
+
+
+if __name__ == "__main__":
+    base_mesh = load_obj(os.path.join(MH_DATA, "3dobjs", "base.obj"))
+    skeleton = bench_weights_load(base_mesh)
+    bench_skinning(base_mesh, skeleton)
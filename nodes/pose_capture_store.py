@@ -0,0 +1,268 @@
+"""Content-addressed store for Pose Studio browser captures.
+
+Captures are uploaded once and saved under the SHA-256 of their bytes, so
+pose_data only carries the hashes instead of base64 images. Identical
+captures are stored once. Files are never modified; reads refresh their
+mtime so collect_garbage() can drop captures that are neither referenced
+by a saved workflow nor used recently.
+
+Garbage collection only sees workflows saved in the ComfyUI user folder,
+not exported or PNG-embedded ones, so it runs on request
+(POST /vnccs/pose_captures/gc) unless VNCCS_CAPTURE_AUTO_GC=1 is set.
+The store is still bounded by default: once it exceeds MAX_STORE_BYTES, the
+least recently used unreferenced captures are trimmed in the background.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+
+from .pose_storage import atomic_write, user_data_dir, user_directory
+
+
+CAPTURE_FORMATS = ("png", "webp")
+
+# Largest accepted capture file
+MAX_CAPTURE_BYTES = 32 * 1024 * 1024
+
+# Size cap of the store (VNCCS_CAPTURE_STORE_MB), and how recently used a
+# capture may be and still be trimmed (the open graphs use recent ones)
+MAX_STORE_BYTES = int(os.environ.get("VNCCS_CAPTURE_STORE_MB", "2048")) * 1024 * 1024
+TRIM_MIN_AGE_HOURS = 1
+
+# Unreferenced captures younger than this are kept (open, unsaved graphs)
+DEFAULT_GC_MIN_AGE_HOURS = 24 * 7
+
+# Opt-in automatic garbage collection, run at most every GC_INTERVAL_SECONDS
+AUTO_GC = os.environ.get("VNCCS_CAPTURE_AUTO_GC", "") not in ("", "0")
+GC_INTERVAL_SECONDS = 24 * 3600
+
+# Time of the last collection, kept across restarts
+GC_STAMP_FILE = ".last_gc"
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_HASH_SCAN_RE = re.compile(rb"[0-9a-f]{64}")
+
+
+def is_capture_hash(value):
+    return isinstance(value, str) and _HASH_RE.match(value) is not None
+
+
+def capture_format(data):
+    """Format of encoded capture bytes, from their signature.
+
+    Raises ValueError for data that is not a PNG or WebP image, or larger
+    than MAX_CAPTURE_BYTES.
+    """
+    if len(data) > MAX_CAPTURE_BYTES:
+        raise ValueError(f"Capture larger than {MAX_CAPTURE_BYTES // (1024 * 1024)} MB")
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    raise ValueError("Capture is not a PNG or WebP image")
+
+
+def _workflow_references():
+    """Capture hashes mentioned in the saved workflows of every ComfyUI user."""
+    refs = set()
+    root = user_directory()
+    try:
+        users = os.listdir(root)
+    except OSError:
+        return refs
+    for user in users:
+        workflows = os.path.join(root, user, "workflows")
+        for dirpath, _, filenames in os.walk(workflows):
+            for name in filenames:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(dirpath, name), "rb") as f:
+                        refs.update(m.decode("ascii") for m in _HASH_SCAN_RE.findall(f.read()))
+                except OSError:
+                    pass
+    return refs
+
+
+class CaptureStore:
+    """Capture files named by the SHA-256 of their content."""
+
+    def __init__(self, root=None):
+        self.root = root or user_data_dir("pose_captures")
+        self._lock = threading.Lock()
+        self._last_gc = None  # Read from GC_STAMP_FILE on first use
+        self._bytes = None  # Total size of the captures, counted on first put
+        self._trimming = False
+
+    def _path(self, digest, fmt):
+        return os.path.join(self.root, digest[:2], f"{digest}.{fmt}")
+
+    def find(self, digest):
+        """Return (path, format) of a stored capture, or None."""
+        if not is_capture_hash(digest):
+            return None
+        for fmt in CAPTURE_FORMATS:
+            path = self._path(digest, fmt)
+            if os.path.exists(path):
+                return path, fmt
+        return None
+
+    def put(self, data):
+        """Store encoded PNG/WebP bytes and return their hash.
+
+        Raises ValueError for other data (see capture_format).
+        """
+        fmt = capture_format(data)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest, fmt)
+        if os.path.exists(path):
+            os.utime(path)  # Same content already stored
+        else:
+            atomic_write(path, data)
+            self._count(len(data))
+        self._maybe_collect()
+        return digest
+
+    def get(self, digest):
+        """Return a capture as {"format", "data"} (see _open_capture), or None."""
+        found = self.find(digest)
+        if found is None:
+            return None
+        path, fmt = found
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return {"format": fmt, "data": data}
+
+    def _captures(self):
+        """(mtime, size, path, digest) of every stored capture."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                digest, _, fmt = name.partition(".")
+                if fmt not in CAPTURE_FORMATS:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path, digest))
+        return entries
+
+    def _count(self, added):
+        """Add to the store size; start a trim when it passes MAX_STORE_BYTES."""
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _, _ in self._captures())
+            else:
+                self._bytes += added
+            if self._bytes <= MAX_STORE_BYTES or self._trimming:
+                return
+            self._trimming = True
+        threading.Thread(target=self.trim, name="vnccs_capture_trim", daemon=True).start()
+
+    def trim(self, max_bytes=None, min_age_hours=TRIM_MIN_AGE_HOURS):
+        """Delete least recently used unreferenced captures until the store fits max_bytes.
+
+        Captures used within min_age_hours or referenced by a saved workflow
+        are kept, even if the store stays over the cap. Returns
+        (removed count, freed bytes).
+        """
+        max_bytes = MAX_STORE_BYTES if max_bytes is None else max_bytes
+        removed, freed = 0, 0
+        try:
+            entries = sorted(self._captures())
+            total = sum(size for _, size, _, _ in entries)
+            if total > max_bytes:
+                referenced = _workflow_references()
+                cutoff = time.time() - min_age_hours * 3600
+                for mtime, size, path, digest in entries:
+                    if total <= max_bytes or mtime >= cutoff:
+                        break
+                    if digest in referenced:
+                        continue
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    removed += 1
+                    freed += size
+            with self._lock:
+                self._bytes = total
+        finally:
+            self._trimming = False
+        if removed:
+            print(f"[VNCCS Pose Studio] Trimmed {removed} unreferenced captures ({freed / 1e6:.1f} MB) "
+                  f"to the {max_bytes / 1e6:.0f} MB store limit")
+        return removed, freed
+
+    def collect_garbage(self, keep=(), min_age_hours=DEFAULT_GC_MIN_AGE_HOURS):
+        """Delete captures that are unreferenced and unused for min_age_hours.
+
+        A capture is referenced if its hash is in keep (e.g. the graphs open
+        in the browser) or appears in a saved workflow. Returns
+        (removed count, freed bytes).
+        """
+        referenced = set(keep) | _workflow_references()
+        cutoff = time.time() - min_age_hours * 3600
+        removed, freed = 0, 0
+        with self._lock:
+            self._mark_collected()
+            for mtime, size, path, digest in self._captures():
+                if digest in referenced or mtime >= cutoff:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+            if self._bytes is not None:
+                self._bytes -= freed
+        if removed:
+            print(f"[VNCCS Pose Studio] Removed {removed} unreferenced captures ({freed / 1e6:.1f} MB)")
+        return removed, freed
+
+    def _last_collected(self):
+        if self._last_gc is None:
+            try:
+                self._last_gc = os.path.getmtime(os.path.join(self.root, GC_STAMP_FILE))
+            except OSError:
+                self._last_gc = 0.0
+        return self._last_gc
+
+    def _mark_collected(self):
+        self._last_gc = time.time()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, GC_STAMP_FILE), "w") as f:
+                f.write(str(self._last_gc))
+        except OSError:
+            pass
+
+    def _maybe_collect(self):
+        """With AUTO_GC, run collect_garbage in the background at most every GC_INTERVAL_SECONDS."""
+        if not AUTO_GC:
+            return
+        with self._lock:
+            if time.time() - self._last_collected() < GC_INTERVAL_SECONDS:
+                return
+            self._mark_collected()
+        threading.Thread(target=self.collect_garbage, name="vnccs_capture_gc", daemon=True).start()
+
+
+CAPTURE_STORE = {"store": None}
+
+
+def get_capture_store():
+    if CAPTURE_STORE["store"] is None:
+        CAPTURE_STORE["store"] = CaptureStore()
+    return CAPTURE_STORE["store"]
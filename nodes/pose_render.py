@@ -0,0 +1,539 @@
+"""VNCCS Pose Studio - Python fallback renderer.
+
+MakeHuman data loading, posing (FK + skinning) and z-buffer rendering of
+the Pose Studio node. Only needs numpy and PIL; the node module adds the
+torch outputs on top.
+"""
+
+import os
+import threading
+import numpy as np
+from PIL import Image
+
+# Import from CharacterData module
+from ..CharacterData.mh_parser import TargetParser, HumanSolver
+from ..CharacterData.obj_loader import load_obj
+from ..CharacterData import matrix
+from ..CharacterData.mh_skeleton import Skeleton
+from .pose_render_cache import StageCache
+
+
+# === Data Cache and Loader (from Character Studio) ===
+
+# Singleton storage for loaded MH data to avoid reloading every time
+POSE_STUDIO_CACHE = {
+    "base_mesh": None,
+    "targets": None,
+    "parser": None,
+    "skeleton": None,
+    "render_tris": None,
+    "face_keypoints": None
+}
+
+# Serializes the first load (node execution and preview API threads)
+_DATA_LOCK = threading.Lock()
+
+# In-memory memo of the pipeline stages: solve -> fit -> pose (FK + skin) -> render.
+# Renders hold the image and full-size float maps, so that stage is also capped by bytes.
+PIPELINE_CACHE = StageCache({"solve": 4, "fit": 4, "pose": 64, "render": 16},
+                            max_bytes={"render": 256 * 1024 * 1024})
+
+# Fitted skeleton of each render pool thread: {"fit_key", "skel"}
+_RENDER_THREAD = threading.local()
+
+# Framing zoom of the fallback renderer per VNCCS_PositionControl distance
+VIEW_DISTANCE_ZOOM = {"close-up": 2.0, "medium shot": 1.0, "wide shot": 0.75}
+
+# Face groups drawn by the Python fallback renderer
+RENDER_FACE_GROUPS = ["body", "helper-r-eye", "helper-l-eye", "helper-upper-teeth", "helper-lower-teeth"]
+
+
+def _get_character_data_path():
+    """Get the path to CharacterData folder."""
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "CharacterData"))
+
+
+def _ensure_data_loaded():
+    """Load MakeHuman data if not already loaded (safe from several threads)."""
+    # base_mesh is set before loading finishes, so also wait while a load holds the lock
+    if POSE_STUDIO_CACHE['base_mesh'] is not None and not _DATA_LOCK.locked():
+        return
+    with _DATA_LOCK:
+        if POSE_STUDIO_CACHE['base_mesh'] is None:
+            _load_data()
+
+
+def _load_data():
+    char_data_path = _get_character_data_path()
+    mh_path = os.path.join(char_data_path, "makehuman")
+    
+    if not os.path.exists(mh_path):
+        raise Exception(f"MakeHuman data not found at: {mh_path}")
+
+    print(f"[VNCCS Pose Studio] Loading MakeHuman data from {mh_path}...")
+
+    # 1. Load Base Mesh
+    base_obj_paths = [
+        os.path.join(mh_path, "makehuman", "data", "3dobjs", "base.obj"),
+        os.path.join(mh_path, "data", "3dobjs", "base.obj"),
+    ]
+    
+    base_path = next((p for p in base_obj_paths if os.path.exists(p)), None)
+    if not base_path:
+        raise Exception("Could not find base.obj inside makehuman data.")
+
+    POSE_STUDIO_CACHE['base_mesh'] = load_obj(base_path)
+    
+    # 2. Load Targets
+    parser = TargetParser(mh_path)
+    POSE_STUDIO_CACHE['targets'] = parser.scan_targets()
+    POSE_STUDIO_CACHE['parser'] = parser
+    
+    print(f"[VNCCS Pose Studio] Loaded {len(POSE_STUDIO_CACHE['targets'])} targets.")
+    
+    # 3. Load Skeleton (Preference: game_engine > default)
+    skel_path = os.path.join(mh_path, "makehuman", "data", "rigs", "game_engine.mhskel")
+    if not os.path.exists(skel_path):
+        skel_path = os.path.join(mh_path, "makehuman", "data", "rigs", "default.mhskel")
+        
+    if os.path.exists(skel_path):
+        print(f"[VNCCS Pose Studio] Loading skeleton from {skel_path}...")
+        skel = Skeleton()
+        skel.fromFile(skel_path, POSE_STUDIO_CACHE['base_mesh'])
+        POSE_STUDIO_CACHE['skeleton'] = skel
+    else:
+        print(f"[VNCCS Pose Studio] Warning: Default skeleton not found at {skel_path}")
+
+
+def _get_render_triangles(vertex_count):
+    """Triangulate the rendered face groups of the base mesh once.
+
+    Returns (tris, groups): (T, 3) int32 vertex indices and the index into
+    RENDER_FACE_GROUPS of each triangle.
+    """
+    cached = POSE_STUDIO_CACHE.get('render_tris')
+    if cached is not None:
+        return cached
+    
+    base_mesh = POSE_STUDIO_CACHE['base_mesh']
+    tri_list = []
+    group_list = []
+    if base_mesh.face_groups:
+        for face, group in zip(base_mesh.faces, base_mesh.face_groups):
+            g_clean = group.strip()
+            if g_clean not in RENDER_FACE_GROUPS or len(face) < 3:
+                continue
+            v_indices = [item[0] if isinstance(item, (list, tuple)) else item for item in face]
+            if any(vi >= vertex_count for vi in v_indices):
+                continue
+            # Fan triangulation (quads -> 2 triangles)
+            for k in range(1, len(v_indices) - 1):
+                tri_list.append((v_indices[0], v_indices[k], v_indices[k + 1]))
+                group_list.append(RENDER_FACE_GROUPS.index(g_clean))
+    
+    cached = (np.array(tri_list, dtype=np.int32).reshape(-1, 3), np.array(group_list, dtype=np.int32))
+    POSE_STUDIO_CACHE['render_tris'] = cached
+    return cached
+
+
+def _get_vertex_bone_labels():
+    """Strongest influencing bone per vertex (index into skeleton.boneslist)."""
+    skel = POSE_STUDIO_CACHE['skeleton']
+    if not skel or not skel.vertexWeights:
+        return np.zeros(len(POSE_STUDIO_CACHE['base_mesh'].vertices), dtype=np.int32)
+    b_idx, _ = skel.vertexWeights.compileData([bone.name for bone in skel.boneslist])
+    return b_idx[:, 0].astype(np.int32)
+
+
+def _segment_palette(n):
+    """Deterministic, well separated RGB colors (n, 3) in 0-1 for segment labels."""
+    hues = (np.arange(n) * 0.618033988749895) % 1.0
+    sat = np.where(np.arange(n) % 2 == 0, 0.85, 0.6)
+    val = np.where(np.arange(n) % 3 == 0, 0.95, 0.8)
+    # HSV -> RGB
+    k = (np.array([5.0, 3.0, 1.0])[None, :] + hues[:, None] * 6.0) % 6.0
+    rgb = val[:, None] - val[:, None] * sat[:, None] * np.clip(np.minimum(k, 4.0 - k), 0.0, 1.0)
+    return rgb.astype(np.float32)
+
+
+def _rasterize(verts_screen, depth, tris, W, H, tile=32, chunk=256):
+    """Z-buffer rasterization of screen-space triangles.
+
+    Triangles are binned into screen tiles; each tile runs barycentric
+    inside tests for all of its pixels against its triangles at once.
+    Returns (zbuf, tri_ids): nearest interpolated depth per pixel (-inf for
+    background) and the index into tris of the visible triangle (-1).
+    Larger depth is closer to the camera.
+    """
+    zbuf = np.full((H, W), -np.inf, dtype=np.float32)
+    tri_ids = np.full((H, W), -1, dtype=np.int32)
+    if len(tris) == 0:
+        return zbuf, tri_ids
+    
+    p = verts_screen[tris].astype(np.float64)  # (T, 3, 2)
+    tz = depth[tris].astype(np.float64)        # (T, 3)
+    x0, x1, x2 = p[:, 0, 0], p[:, 1, 0], p[:, 2, 0]
+    y0, y1, y2 = p[:, 0, 1], p[:, 1, 1], p[:, 2, 1]
+    area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+    
+    # Pixel range covered by each bounding box (pixel centers at +0.5)
+    px_min = np.ceil(p[:, :, 0].min(axis=1) - 0.5).clip(0, W - 1).astype(np.int64)
+    px_max = np.floor(p[:, :, 0].max(axis=1) - 0.5).clip(-1, W - 1).astype(np.int64)
+    py_min = np.ceil(p[:, :, 1].min(axis=1) - 0.5).clip(0, H - 1).astype(np.int64)
+    py_max = np.floor(p[:, :, 1].max(axis=1) - 0.5).clip(-1, H - 1).astype(np.int64)
+    
+    live = np.nonzero((np.abs(area) > 1e-12) & (px_max >= px_min) & (py_max >= py_min))[0]
+    if len(live) == 0:
+        return zbuf, tri_ids
+    
+    # Barycentric edge functions w_i = a_i * x + b_i * y + c_i (area-normalized),
+    # and the depth plane z = a_z * x + b_z * y + c_z they interpolate.
+    inv_area = 1.0 / area[live]
+    x0, x1, x2, y0, y1, y2 = (v[live] for v in (x0, x1, x2, y0, y1, y2))
+    ea = np.stack([y1 - y2, y2 - y0, y0 - y1], axis=1) * inv_area[:, None]
+    eb = np.stack([x2 - x1, x0 - x2, x1 - x0], axis=1) * inv_area[:, None]
+    ec = np.stack([x1 * y2 - x2 * y1, x2 * y0 - x0 * y2, x0 * y1 - x1 * y0], axis=1) * inv_area[:, None]
+    tz = tz[live]
+    planes = np.stack([(ea * tz).sum(axis=1), (eb * tz).sum(axis=1), (ec * tz).sum(axis=1)], axis=1)
+    
+    # Pack per-triangle coefficients as (4, 3) rows [w0, w1, w2, z] x [a, b, c]
+    coeffs = np.stack([np.stack([ea[:, i], eb[:, i], ec[:, i]], axis=1) for i in range(3)] + [planes], axis=1)
+    coeffs = coeffs.astype(np.float32)
+    
+    # Bin triangles into every tile their bounding box touches
+    tiles_x = (W + tile - 1) // tile
+    tx0, tx1 = px_min[live] // tile, px_max[live] // tile
+    ty0, ty1 = py_min[live] // tile, py_max[live] // tile
+    ntx = tx1 - tx0 + 1
+    counts = ntx * (ty1 - ty0 + 1)
+    local = np.repeat(np.arange(len(live)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    tile_ids = (ty0[local] + offset // ntx[local]) * tiles_x + tx0[local] + offset % ntx[local]
+    
+    order = np.argsort(tile_ids, kind='stable')
+    tile_ids, local = tile_ids[order], local[order]
+    starts = np.flatnonzero(np.r_[True, tile_ids[1:] != tile_ids[:-1]])
+    ends = np.r_[starts[1:], len(tile_ids)]
+    
+    for start, end in zip(starts, ends):
+        t_id = tile_ids[start]
+        ox, oy = (t_id % tiles_x) * tile, (t_id // tiles_x) * tile
+        tw, th = min(tile, W - ox), min(tile, H - oy)
+        gy, gx = np.mgrid[oy:oy + th, ox:ox + tw]
+        pix_t = np.stack([gx.ravel() + 0.5, gy.ravel() + 0.5, np.ones(th * tw)]).astype(np.float32)
+        
+        best_z = zbuf[oy:oy + th, ox:ox + tw].ravel().copy()
+        best_t = tri_ids[oy:oy + th, ox:ox + tw].ravel().copy()
+        for c0 in range(start, end, chunk):
+            t = local[c0:min(c0 + chunk, end)]
+            # (Tc, 4, P): three barycentric weights and the depth per triangle and pixel
+            w = (coeffs[t].reshape(-1, 3) @ pix_t).reshape(len(t), 4, -1)
+            inside = (w[:, 0] >= -1e-6) & (w[:, 1] >= -1e-6) & (w[:, 2] >= -1e-6)
+            z = np.where(inside, w[:, 3], -np.inf)
+            k = z.argmax(axis=0)
+            zk = z[k, np.arange(z.shape[1])]
+            closer = zk > best_z
+            best_z[closer] = zk[closer]
+            best_t[closer] = live[t[k[closer]]]
+        
+        zbuf[oy:oy + th, ox:ox + tw] = best_z.reshape(th, tw)
+        tri_ids[oy:oy + th, ox:ox + tw] = best_t.reshape(th, tw)
+    
+    return zbuf, tri_ids
+
+
+def _render_pose_task(base_verts, fit_key, pose, posed_verts, views, args):
+    """Render pool entry point: pose and render one pose on a render thread.
+
+    _apply_pose re-poses its skeleton in place, so each thread fits its own
+    skeleton once per fit key; the base mesh and MakeHuman data are shared.
+    """
+    node = PoseRenderer()
+    skel = None
+    if posed_verts is None:
+        if getattr(_RENDER_THREAD, "fit_key", None) != fit_key:
+            _RENDER_THREAD.skel = node._fit_skeleton(base_verts)
+            _RENDER_THREAD.fit_key = fit_key
+        skel = _RENDER_THREAD.skel
+    return node._render_pose(base_verts, pose, *args, skel=skel, posed_verts=posed_verts, views=views)
+
+
+class PoseRenderer:
+    """Poses the solved mesh and renders it with the Python fallback renderer."""
+    
+    def _solve_base_verts(self, mh_age, gender, weight, muscle, height, breast_size, firmness, penis_len, penis_circ, penis_test):
+        """Solve the morphed base mesh for the given (normalized) slider values."""
+        solver = HumanSolver()
+        factors = solver.calculate_factors(mh_age, gender, weight, muscle, height, breast_size, firmness, penis_len, penis_circ, penis_test)
+        return solver.solve_mesh(
+            POSE_STUDIO_CACHE['base_mesh'],
+            POSE_STUDIO_CACHE['targets'],
+            factors
+        )
+    
+    def _fit_skeleton(self, verts):
+        """Copy the loaded skeleton and move its joints to match the morphed mesh."""
+        class MeshWrapper:
+            def __init__(self, v): self.vertices = v
+        
+        orig_skel = POSE_STUDIO_CACHE['skeleton']
+        if not orig_skel:
+            return None
+        
+        # We must copy because fitting modifies joint positions
+        skel = orig_skel.copy()
+        skel.updateJointPositions(MeshWrapper(verts))
+        return skel
+    
+    def _render_pose(self, base_verts, pose, view_size, bg_color, lights, supersample=1,
+                     max_influences=None, skin_mode="LBS", segmentation=None, skel=None, posed_verts=None, views=(None,)):
+        """Pose (unless posed_verts is given) and render a single pose dict from each view.
+
+        Returns (posed_verts, [passes per view]).
+        """
+        if posed_verts is None:
+            bones = pose.get("bones", {})
+            model_rotation = pose.get("modelRotation", [0, 0, 0])
+            
+            # Apply pose to skeleton and get posed vertices
+            posed_verts = self._apply_pose(base_verts, bones, model_rotation, max_influences, skin_mode, skel)
+        
+        # Render with background color and current lights; skinned once for all views
+        return posed_verts, [self._render_passes(posed_verts, view_size, bg_color, lights, supersample, segmentation, view)
+                             for view in views]
+    
+    def _apply_pose(self, verts, bones_data, model_rotation, max_influences=None, skin_mode="LBS", skel=None):
+        """Apply bone rotations (FK) and global rotation to vertices.
+
+        skel is a skeleton already fitted to verts (see _fit_skeleton); it is
+        re-posed in place. Without it, the loaded skeleton is copied and fitted.
+        max_influences limits skinning to the strongest K bones per vertex
+        (renormalized). None uses every influence.
+        skin_mode "DQS" uses dual quaternion skinning, which avoids the
+        joint collapse of linear blending at large rotations.
+        """
+        
+        # 1-3. Fitted skeleton (copy of the loaded one, joints moved to the mesh)
+        if skel is None:
+            skel = self._fit_skeleton(verts)
+        if skel is None:
+            # Should not happen if _ensure_data_loaded is called
+            return verts
+        
+        # 4-5. Bone rotations and FK
+        self._pose_skeleton(skel, bones_data)
+            
+        # 6. Skinning (LBS or DQS)
+        # Compiled (V, K) weights: one gather of bone transforms + einsum
+        if skel.vertexWeights:
+            skinned_verts = skel.skinMesh(verts, max_influences, dualQuaternion=(skin_mode == "DQS"))
+        else:
+            print("Pose Studio Warning: No weights found, skinning skipped!")
+            skinned_verts = verts.copy()
+
+        # 7. Apply Global Model Rotation
+        # Rotate around body center
+        return self._rotate_model(skinned_verts, model_rotation, skinned_verts.mean(axis=0))
+    
+    @staticmethod
+    def _pose_skeleton(skel, bones_data):
+        """Set the bone rotations of a pose dict on skel and run FK (in place)."""
+        # Clear any pose left over from a previous use of this skeleton
+        for bone in skel.boneslist:
+            bone.matPose = np.identity(4, np.float32)
+        
+        # 4. Apply rotations to bones
+        # The widget rotates bones with three.js Euler XYZ (Rx * Ry * Rz, degrees)
+        # in world-aligned bone frames. Express that in each bone's rest frame:
+        # matPose = RestRot^T * R * RestRot. Built for all bones in one batch.
+        posed_bones = [(skel.getBone(name), rot) for name, rot in bones_data.items()]
+        posed_bones = [(bone, rot) for bone, rot in posed_bones if bone]
+        if posed_bones:
+            rot_mats = matrix.euler_matrices([rot[:3] for _, rot in posed_bones], order="XYZ", homogeneous=False)
+            rest_rots = np.stack([bone.matRestGlobal[:3, :3] for bone, _ in posed_bones])
+            local_rots = np.matmul(np.swapaxes(rest_rots, 1, 2), np.matmul(rot_mats, rest_rots))
+            for (bone, _), local_rot in zip(posed_bones, local_rots):
+                mat_pose = np.identity(4, dtype=np.float32)
+                mat_pose[:3, :3] = local_rot
+                bone.matPose = mat_pose
+
+        # 5. Update global matrices (FK)
+        # boneslist is breadth-first sorted, so parents always processed before children
+        for bone in skel.boneslist:
+            bone.update()
+    
+    @staticmethod
+    def _rotate_model(points, model_rotation, center):
+        """Apply the pose's global model rotation (degrees) about center."""
+        rx, ry, rz = model_rotation
+        if abs(rx) > 0.01 or abs(ry) > 0.01 or abs(rz) > 0.01:
+            rot_mat = matrix.euler_matrices([rx, ry, rz], order="XYZ", homogeneous=False)[0]
+            
+            points = points - center
+            points = np.dot(points, rot_mat.T)
+            points = points + center
+        
+        return points
+    
+    def _render_passes(self, verts, size, bg_color=(40, 40, 40), lights=[], supersample=1, segmentation=None, view=None):
+        """Rasterize the posed mesh once and derive all render passes from it.
+
+        Returns a dict with the shaded "image" (PIL). If segmentation is
+        "bone" or "face_group", also "depth" (H, W; near = 1), camera-space
+        "normal" (H, W, 3), color-coded "segmentation" (H, W, 3) and the
+        silhouette "mask" (H, W), all float32 in 0-1.
+        supersample renders at N times the resolution and box-filters down.
+        view is a camera dict (azimuth, elevation, distance) as used by
+        VNCCS_PositionControl; the lights stay fixed to the scene.
+        """
+        ss = max(1, int(supersample))
+        W, H = size
+        RW, RH = W * ss, H * ss
+        
+        camera = self._camera_framing(verts, RW, RH, view)
+        verts, verts_screen = self._project(verts, camera, RW, RH)
+        view_rot = camera[0]
+        
+        tris, tri_groups = _get_render_triangles(len(verts))
+        keep, normals, colors = self._shade_triangles(verts, tris, lights, view_rot)
+        tri_index = np.nonzero(keep)[0]
+        
+        # Z-buffer (larger Z is closer to the camera)
+        zbuf, tri_ids = _rasterize(verts_screen, verts[:, 2], tris[tri_index], RW, RH)
+        covered = tri_ids >= 0
+        hit = tri_ids[covered]
+        
+        rgb = np.empty((RH, RW, 3), dtype=np.float32)
+        rgb[:] = np.asarray(bg_color, dtype=np.float32)
+        rgb[covered] = colors[hit]
+        passes = {"image": Image.fromarray(np.clip(self._downsample(rgb, ss) + 0.5, 0, 255).astype(np.uint8), 'RGB')}
+        
+        if segmentation:
+            # Depth: normalized over the visible surface, near = 1
+            depth = np.zeros((RH, RW), dtype=np.float32)
+            if hit.size:
+                z = zbuf[covered]
+                z_min, z_max = z.min(), z.max()
+                depth[covered] = (z - z_min) / max(z_max - z_min, 1e-6) * 0.9 + 0.1
+            
+            # Normals: camera space (x right, y up, z to camera), flat background
+            normal = np.empty((RH, RW, 3), dtype=np.float32)
+            normal[:] = (0.5, 0.5, 1.0)
+            normal[covered] = normals[hit] * 0.5 + 0.5
+            
+            # Segmentation: per-triangle label, color coded
+            if segmentation == "face_group":
+                labels = tri_groups[tri_index]
+            else:
+                labels = _get_vertex_bone_labels()[tris[tri_index, 0]]
+            seg = np.zeros((RH, RW, 3), dtype=np.float32)
+            seg[covered] = _segment_palette(int(labels.max()) + 1 if labels.size else 1)[labels[hit]]
+            
+            passes["depth"] = self._downsample(depth, ss)
+            passes["normal"] = self._downsample(normal, ss)
+            passes["segmentation"] = seg[ss // 2::ss, ss // 2::ss] # Keep labels crisp
+            passes["mask"] = self._downsample(covered.astype(np.float32), ss)
+        
+        return passes
+    
+    @staticmethod
+    def _downsample(img, ss):
+        """Box-filter an (H*ss, W*ss, ...) array down by ss."""
+        if ss <= 1:
+            return img
+        h, w = img.shape[0] // ss, img.shape[1] // ss
+        return img.reshape((h, ss, w, ss) + img.shape[2:]).mean(axis=(1, 3))
+    
+    def _camera_framing(self, verts, W, H, view=None, margin=1.0):
+        """Camera that frames the posed mesh in a W x H image.
+
+        Returns (view_rot, pivot, center, scale): the scene rotation for the
+        view (None for the default camera) about pivot, then the orthographic
+        framing center and pixels per unit. margin widens the framed extent,
+        for points that lie inside the figure (joints) rather than on it.
+        """
+        # Orbit the camera by turning the scene the opposite way
+        view_rot = None
+        pivot = None
+        zoom = 1.0
+        if view:
+            view_rot = self._view_rotation(view)
+            pivot = verts.mean(axis=0)
+            verts = (verts - pivot) @ view_rot.T + pivot
+            zoom = VIEW_DISTANCE_ZOOM.get(view.get("distance"), 1.0)
+        
+        # Frame the figure (orthographic, camera looking down -Z)
+        center = verts.mean(axis=0)
+        scale = min(W, H) * 0.4 * zoom / max(np.abs(verts - center).max() * margin, 0.001)
+        if zoom > 1.0:
+            # Closer framing: keep the top of the figure (the head) in frame
+            center[1] = max(center[1], verts[:, 1].max() - H * 0.45 / scale)
+        return view_rot, pivot, center, scale
+    
+    @staticmethod
+    def _project(points, camera, W, H):
+        """Apply a camera from _camera_framing. Returns (view-space points, (N, 2) pixel coords)."""
+        view_rot, pivot, center, scale = camera
+        if view_rot is not None:
+            points = (points - pivot) @ view_rot.T + pivot
+        
+        screen = np.zeros((len(points), 2))
+        screen[:, 0] = (points[:, 0] - center[0]) * scale + W / 2
+        screen[:, 1] = H / 2 - (points[:, 1] - center[1]) * scale
+        return points, screen
+    
+    @staticmethod
+    def _view_rotation(view):
+        """Scene rotation (3, 3) for a camera at azimuth/elevation degrees.
+
+        Azimuth 90 puts the camera at the character's right side, positive
+        elevation above it looking down.
+        """
+        return matrix.euler_matrices([view.get("elevation", 0), view.get("azimuth", 0), 0],
+                                     order="XYZ", homogeneous=False)[0]
+    
+    def _shade_triangles(self, verts_3d, tris, lights=[], view_rot=None):
+        """Flat shading and back-face culling for all triangles at once.
+
+        Returns (keep, normals, colors) where normals and colors (0-255)
+        cover only the kept, camera-facing triangles. view_rot turns the
+        scene lights along with the geometry.
+        """
+        # 1. Setup Lighting from params
+        main_light_dir = np.array([0.5, 0.8, 1.0])
+        main_light_int = 0.7
+        ambient_int = 0.3
+        
+        if lights:
+            # Simple aggregation of lights for Python renderer
+            for l in lights:
+                lt = l.get("type", "ambient")
+                if lt == "ambient":
+                    ambient_int = max(0.2, min(0.6, l.get("intensity", 1.0) * 0.4))
+                elif lt == "directional" or lt == "point":
+                    # For point lights we just use direction to center
+                    x, y, z = l.get("x", 0), l.get("y", 10), l.get("z", 10)
+                    main_light_dir = np.array([x, y, z])
+                    mag = np.linalg.norm(main_light_dir)
+                    if mag > 0.001: main_light_dir = main_light_dir / mag
+                    main_light_int = min(1.2, l.get("intensity", 1.0) * 0.8)
+                    break # Use first found as main for flat shading
+        
+        if view_rot is not None:
+            main_light_dir = view_rot @ main_light_dir
+        
+        # Skin base color (warm tone)
+        base_color = np.array([212, 165, 116], dtype=np.float32)  # 0xd4a574
+        
+        # 2. Per-triangle normals, back-face culling (faces are CCW outward)
+        p0 = verts_3d[tris[:, 0]]
+        normals = np.cross(verts_3d[tris[:, 1]] - p0, verts_3d[tris[:, 2]] - p0)
+        norm_len = np.linalg.norm(normals, axis=1)
+        keep = (norm_len > 1e-8) & (normals[:, 2] > 0)
+        normals = (normals[keep] / norm_len[keep, np.newaxis]).astype(np.float32)
+        
+        # 3. Lighting per triangle, in bulk
+        diffuse = np.maximum(0, normals @ main_light_dir)
+        intensity = np.minimum(1.0, ambient_int + diffuse * main_light_int)
+        colors = np.clip(base_color * intensity[:, np.newaxis], 0, 255).astype(np.int32).astype(np.float32)
+        return keep, normals, colors
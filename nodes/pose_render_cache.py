@@ -0,0 +1,253 @@
+"""Caches for the Pose Studio render pipeline.
+
+StageCache memoizes the in-memory stages (solve, fit, pose, render) so an
+edit only recomputes the stages downstream of what changed.
+
+PoseRenderCache persists finished renders on disk. Each rendered pose
+(image plus auxiliary maps) is stored as one compressed .npz file named
+after a stable hash of everything that affects the render. It survives
+server restarts and ComfyUI's in-memory cache eviction, and is capped in
+size with least-recently-used eviction (file mtime is refreshed on hits).
+Entries are compressed and written by a background thread, so a cache miss
+costs no more than the render itself.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from .pose_storage import atomic_write, user_data_dir
+
+
+# Bump when the renderer output changes so stale entries are never served
+CACHE_VERSION = 1
+
+DEFAULT_MAX_MB = 1024
+
+# Renders waiting to be written at most; more are not cached
+MAX_PENDING_WRITES = 8
+
+
+def make_key(**parts):
+    """Stable hash of JSON-serializable inputs."""
+    payload = json.dumps({"version": CACHE_VERSION, **parts}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def value_nbytes(value):
+    """Approximate memory held by a cached value: arrays and PIL images, also inside dicts, lists and tuples."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(v) for v in value)
+    return 0
+
+
+class StageCache:
+    """Per-stage in-memory LRU memo with hit/miss counters.
+
+    sizes maps each stage name to its maximum number of entries; max_bytes
+    optionally caps a stage by the memory of its entries (see value_nbytes),
+    keeping at least the newest one. Keys are built by the caller from the
+    stage's own inputs, usually including the key of the upstream stage, so
+    a change invalidates everything after it.
+    """
+
+    def __init__(self, sizes, max_bytes=None):
+        self.sizes = dict(sizes)
+        self.max_bytes = dict(max_bytes or {})
+        self._entries = {stage: OrderedDict() for stage in self.sizes}
+        self._bytes = {stage: 0 for stage in self.sizes}
+        self._counts = {stage: [0, 0] for stage in self.sizes}  # [hits, lookups] since last report
+        self._totals = {stage: [0, 0] for stage in self.sizes}
+        self._lock = threading.Lock()
+
+    def get(self, stage, key, track=True):
+        """Return the stored value or None."""
+        with self._lock:
+            entries = self._entries[stage]
+            entry = entries.get(key)
+            value = entry[0] if entry is not None else None
+            if value is not None:
+                entries.move_to_end(key)
+            if track:
+                for counts in (self._counts[stage], self._totals[stage]):
+                    counts[0] += value is not None
+                    counts[1] += 1
+            return value
+
+    def put(self, stage, key, value):
+        size = value_nbytes(value) if stage in self.max_bytes else 0
+        with self._lock:
+            entries = self._entries[stage]
+            old = entries.pop(key, None)
+            if old is not None:
+                self._bytes[stage] -= old[1]
+            entries[key] = (value, size)
+            self._bytes[stage] += size
+            max_bytes = self.max_bytes.get(stage)
+            while len(entries) > self.sizes[stage] or (
+                    max_bytes is not None and self._bytes[stage] > max_bytes and len(entries) > 1):
+                self._bytes[stage] -= entries.popitem(last=False)[1][1]
+
+    def get_or_compute(self, stage, key, compute, track=True):
+        """Return the stored value, computing and storing it on a miss."""
+        value = self.get(stage, key, track)
+        if value is None:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def report(self):
+        """Summarize hits since the last report (and overall), then reset."""
+        with self._lock:
+            parts = []
+            for stage, (hits, lookups) in self._counts.items():
+                if lookups:
+                    total_hits, total_lookups = self._totals[stage]
+                    parts.append(f"{stage} {hits}/{lookups} ({100.0 * total_hits / total_lookups:.0f}% overall)")
+                self._counts[stage] = [0, 0]
+            return ", ".join(parts)
+
+    def clear(self):
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+            self._bytes = {stage: 0 for stage in self.sizes}
+
+
+class PoseRenderCache:
+    """Content-addressed store of render pass dicts with an LRU size cap."""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root or user_data_dir("pose_render_cache")
+        self.max_bytes = max_bytes
+        self._size = None  # Bytes on disk, scanned lazily
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> arrays queued for writing, served by get()
+        self._writer = None
+
+    make_key = staticmethod(make_key)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def get(self, key):
+        """Return the cached render pass dict for key, or None."""
+        with self._lock:
+            arrays = self._pending.get(key)
+        if arrays is not None:
+            passes = dict(arrays)
+            passes["image"] = Image.fromarray(passes["image"], 'RGB')
+            return passes
+
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                passes = {name: data[name] for name in data.files}
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError, KeyError):
+            return None
+
+        passes["image"] = Image.fromarray(passes["image"], 'RGB')
+        return passes
+
+    def put(self, key, passes):
+        """Queue a render pass dict to be stored in the background."""
+        arrays = {name: (np.asarray(value) if name != "image" else np.array(value.convert('RGB')))
+                  for name, value in passes.items()}
+        with self._lock:
+            if key in self._pending or len(self._pending) >= MAX_PENDING_WRITES:
+                return
+            self._pending[key] = arrays
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vnccs_render_cache")
+            writer = self._writer
+        writer.submit(self._write, key, arrays)
+
+    def flush(self):
+        """Wait for queued writes to finish."""
+        with self._lock:
+            writer = self._writer
+        if writer is not None:
+            writer.submit(lambda: None).result()
+
+    def _write(self, key, arrays):
+        """Writer thread job: store one entry, then drop it from the pending set."""
+        try:
+            self._store(key, arrays)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _store(self, key, arrays):
+        """Write one entry and evict old entries if over the cap."""
+        path = self._path(key)
+        try:
+            try:
+                old_size = os.path.getsize(path)  # Replaced entry no longer counts
+            except OSError:
+                old_size = 0
+            atomic_write(path, lambda f: np.savez_compressed(f, **arrays))
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[VNCCS Pose Studio] Render cache write failed: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += size - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        """List (mtime, size, path) of all entries and their total size."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries, sum(e[1] for e in entries)
+
+    def _evict(self):
+        """Delete least recently used entries down to 90% of the cap."""
+        entries, total = self._scan()
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+    def clear(self):
+        """Remove every cached render."""
+        self.flush()
+        with self._lock:
+            for _, _, path in self._scan()[0]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
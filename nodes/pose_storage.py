@@ -0,0 +1,41 @@
+"""File helpers shared by the Pose Studio disk stores (render cache, capture store)."""
+
+import os
+import threading
+
+
+def user_directory():
+    """ComfyUI's user directory, or <package>/.cache outside ComfyUI."""
+    try:
+        import folder_paths
+        return folder_paths.get_user_directory()
+    except (ImportError, AttributeError):
+        return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache"))
+
+
+def user_data_dir(name):
+    """Persistent folder user/vnccs/<name> (ComfyUI's temp folder is wiped on startup)."""
+    return os.path.abspath(os.path.join(user_directory(), "vnccs", name))
+
+
+def atomic_write(path, write):
+    """Create or replace path so readers never see a partial file.
+
+    write is the content as bytes, or a callable that writes to the open
+    binary file. Raises OSError on failure, leaving no temporary file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(tmp_path, "wb") as f:
+            if callable(write):
+                write(f)
+            else:
+                f.write(write)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
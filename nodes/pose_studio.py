@@ -10,90 +10,191 @@ This node is fully self-contained with all data loading logic.
 import json
 import os
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import torch
 import numpy as np
 from PIL import Image, ImageDraw
 
-# Import from CharacterData module
-from ..CharacterData.mh_parser import TargetParser, HumanSolver
-from ..CharacterData.obj_loader import load_obj
-from ..CharacterData import matrix
-from ..CharacterData.mh_skeleton import Skeleton
+from .vnccs_nodes import VNCCS_PositionControl
+from .pose_render import (PoseRenderer, POSE_STUDIO_CACHE, PIPELINE_CACHE, _ensure_data_loaded,
+                          _render_pose_task)
+from .pose_render_cache import PoseRenderCache, DEFAULT_MAX_MB, make_key
+from .pose_capture_store import get_capture_store
 
 
-# === Data Cache and Loader (from Character Studio) ===
+# Persistent render cache on disk, created on first use
+RENDER_DISK_CACHE = {"cache": None}
 
-# Singleton storage for loaded MH data to avoid reloading every time
-POSE_STUDIO_CACHE = {
-    "base_mesh": None,
-    "targets": None,
-    "parser": None,
-    "skeleton": None
-}
+# Threads decoding client captures: {"pool": executor}
+DECODE_POOL = {"pool": None}
 
+# Threads for parallel pose rendering: {"pool": executor, "workers": n}
+RENDER_POOL = {"pool": None, "workers": 0}
 
-def _get_character_data_path():
-    """Get the path to CharacterData folder."""
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "CharacterData"))
+# OpenPose BODY_18 keypoints: bone whose posed head marks the joint,
+# or a face point taken from the mesh ("nose", "eye_r", ...)
+OPENPOSE_KEYPOINTS = [
+    "nose", "neck_01", "upperarm_r", "lowerarm_r", "hand_r", "upperarm_l", "lowerarm_l", "hand_l",
+    "thigh_r", "calf_r", "foot_r", "thigh_l", "calf_l", "foot_l", "eye_r", "eye_l", "ear_r", "ear_l",
+]
 
+# OpenPose framing pads the joint extent by this factor to cover the surface around it
+JOINT_FRAMING_MARGIN = 1.1
 
-def _ensure_data_loaded():
-    """Load MakeHuman data if not already loaded."""
-    if POSE_STUDIO_CACHE['base_mesh'] is not None:
-        return
+# Limbs (keypoint index pairs) and colors of the standard OpenPose drawing
+OPENPOSE_LIMBS = [
+    (1, 2), (1, 5), (2, 3), (3, 4), (5, 6), (6, 7), (1, 8), (8, 9), (9, 10),
+    (1, 11), (11, 12), (12, 13), (1, 0), (0, 14), (14, 16), (0, 15), (15, 17),
+]
+OPENPOSE_COLORS = [
+    (255, 0, 0), (255, 85, 0), (255, 170, 0), (255, 255, 0), (170, 255, 0), (85, 255, 0),
+    (0, 255, 0), (0, 255, 85), (0, 255, 170), (0, 255, 255), (0, 170, 255), (0, 85, 255),
+    (0, 0, 255), (85, 0, 255), (170, 0, 255), (255, 0, 255), (255, 0, 170), (255, 0, 85),
+]
 
-    char_data_path = _get_character_data_path()
-    mh_path = os.path.join(char_data_path, "makehuman")
-    
-    if not os.path.exists(mh_path):
-        raise Exception(f"MakeHuman data not found at: {mh_path}")
 
-    print(f"[VNCCS Pose Studio] Loading MakeHuman data from {mh_path}...")
+def _get_face_keypoint_vertices():
+    """Base mesh vertex indices for the OpenPose face points, found once.
 
-    # 1. Load Base Mesh
-    base_obj_paths = [
-        os.path.join(mh_path, "makehuman", "data", "3dobjs", "base.obj"),
-        os.path.join(mh_path, "data", "3dobjs", "base.obj"),
-    ]
+    Eyes average their helper eyeball vertices; the nose is the most forward
+    body vertex between and below the eyes; the ears are the outermost head
+    vertices around eye height.
+    """
+    cached = POSE_STUDIO_CACHE.get('face_keypoints')
+    if cached is not None:
+        return cached
     
-    base_path = next((p for p in base_obj_paths if os.path.exists(p)), None)
-    if not base_path:
-        raise Exception("Could not find base.obj inside makehuman data.")
-
-    POSE_STUDIO_CACHE['base_mesh'] = load_obj(base_path)
+    base_mesh = POSE_STUDIO_CACHE['base_mesh']
+    verts = np.asarray(base_mesh.vertices, dtype=np.float32)
+    groups = {}
+    for face, group in zip(base_mesh.faces, base_mesh.face_groups):
+        g_clean = group.strip()
+        if g_clean in ("body", "helper-r-eye", "helper-l-eye"):
+            groups.setdefault(g_clean, set()).update(item[0] if isinstance(item, (list, tuple)) else item for item in face)
+    body = np.array(sorted(groups["body"]), dtype=np.int64)
+    eye_r = np.array(sorted(groups["helper-r-eye"]), dtype=np.int64)
+    eye_l = np.array(sorted(groups["helper-l-eye"]), dtype=np.int64)
     
-    # 2. Load Targets
-    parser = TargetParser(mh_path)
-    POSE_STUDIO_CACHE['targets'] = parser.scan_targets()
-    POSE_STUDIO_CACHE['parser'] = parser
+    eye_r_pos, eye_l_pos = verts[eye_r].mean(axis=0), verts[eye_l].mean(axis=0)
+    eye_gap = abs(eye_l_pos[0] - eye_r_pos[0])
+    eye_y = (eye_r_pos[1] + eye_l_pos[1]) / 2
     
-    print(f"[VNCCS Pose Studio] Loaded {len(POSE_STUDIO_CACHE['targets'])} targets.")
+    b = verts[body]
+    nose_zone = (np.abs(b[:, 0]) < eye_gap * 0.25) & (b[:, 1] < eye_y) & (b[:, 1] > eye_y - eye_gap * 1.5)
+    nose = body[nose_zone][np.argmax(b[nose_zone, 2])]
+    ear_zone = (np.abs(b[:, 1] - eye_y + eye_gap * 0.3) < eye_gap * 0.5) & (np.abs(b[:, 0]) < eye_gap * 2.5)
+    ear_r = body[ear_zone][np.argmin(b[ear_zone, 0])]  # Character's right is -X
+    ear_l = body[ear_zone][np.argmax(b[ear_zone, 0])]
     
-    # 3. Load Skeleton (Preference: game_engine > default)
-    skel_path = os.path.join(mh_path, "makehuman", "data", "rigs", "game_engine.mhskel")
-    if not os.path.exists(skel_path):
-        skel_path = os.path.join(mh_path, "makehuman", "data", "rigs", "default.mhskel")
-        
-    if os.path.exists(skel_path):
-        print(f"[VNCCS Pose Studio] Loading skeleton from {skel_path}...")
-        skel = Skeleton()
-        skel.fromFile(skel_path, POSE_STUDIO_CACHE['base_mesh'])
-        POSE_STUDIO_CACHE['skeleton'] = skel
-    else:
-        print(f"[VNCCS Pose Studio] Warning: Default skeleton not found at {skel_path}")
+    cached = {"nose": [nose], "eye_r": eye_r, "eye_l": eye_l, "ear_r": [ear_r], "ear_l": [ear_l]}
+    POSE_STUDIO_CACHE['face_keypoints'] = cached
+    return cached
 
 
 # === Main Node Class ===
 
-class VNCCS_PoseStudio:
+def _get_render_cache(max_mb=DEFAULT_MAX_MB):
+    """Return the shared on-disk render cache with the given size cap."""
+    cache = RENDER_DISK_CACHE["cache"]
+    if cache is None:
+        cache = PoseRenderCache()
+        RENDER_DISK_CACHE["cache"] = cache
+    cache.max_bytes = max_mb * 1024 * 1024
+    return cache
+
+
+def _get_render_pool(workers):
+    """Return the thread pool of the configured render_workers, created on first use.
+
+    The pool is only replaced when render_workers changes, never for the
+    number of poses to render: fewer tasks simply leave threads idle.
+    Threads share the loaded MakeHuman data and the solved base mesh; the
+    heavy numpy work (skinning, rasterization) releases the GIL.
+    """
+    if RENDER_POOL["pool"] is not None and RENDER_POOL["workers"] == workers:
+        return RENDER_POOL["pool"]
+    if RENDER_POOL["pool"] is not None:
+        RENDER_POOL["pool"].shutdown(wait=False)
+    
+    RENDER_POOL["pool"] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vnccs_render")
+    RENDER_POOL["workers"] = workers
+    return RENDER_POOL["pool"]
+
+
+def _get_decode_pool():
+    """Thread pool for decoding captures (PIL and torch release the GIL)."""
+    if DECODE_POOL["pool"] is None:
+        DECODE_POOL["pool"] = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                                 thread_name_prefix="vnccs_decode")
+    return DECODE_POOL["pool"]
+
+
+def _open_capture(src):
+    """Open one capture without decoding its pixels.
+
+    src is a base64 data URL string (legacy JSON upload) or a dict from the
+    binary upload: {"format": "png" | "webp" | "rgba" | "rgb", "data": bytes,
+    "width", "height"} (size only needed for raw pixels, rows top-down).
+    Returns a PIL image or None.
+    """
+    try:
+        if isinstance(src, dict):
+            fmt = src.get("format", "png").lower()
+            if fmt in ("rgba", "rgb"):
+                size = (int(src["width"]), int(src["height"]))
+                return Image.frombuffer(fmt.upper(), size, src["data"], "raw", fmt.upper(), 0, 1)
+            return Image.open(BytesIO(src["data"]))
+        
+        if not src:
+            return None
+        # Remove header if present (data:image/png;base64,...)
+        if "," in src:
+            src = src.split(",", 1)[1]
+        return Image.open(BytesIO(base64.b64decode(src)))
+    except Exception as e:
+        print(f"Pose Studio Error: Failed to decode image: {e}")
+        return None
+
+
+def _decode_captures(sources):
+    """Decode client captures in parallel straight into one float [N, H, W, 3] tensor.
+
+    Headers are read first to size the batch; pixels are then decoded by
+    the thread pool directly into their slices. Images that differ from
+    the first one's size are resized to it; undecodable ones are skipped.
+    Returns None if nothing could be decoded.
+    """
+    pool = _get_decode_pool()
+    images = [img for img in pool.map(_open_capture, sources) if img is not None]
+    if not images:
+        return None
+    
+    w, h = images[0].size
+    batch = torch.empty((len(images), h, w, 3), dtype=torch.float32)
+    
+    def decode_into(i):
+        img = images[i].convert('RGB')
+        if img.size != (w, h):
+            img = img.resize((w, h), Image.LANCZOS)
+        batch[i].copy_(torch.from_numpy(np.array(img))).div_(255.0)
+    
+    for _ in pool.map(decode_into, range(len(images))):
+        pass
+    return batch
+
+
+class VNCCS_PoseStudio(PoseRenderer):
     """Pose Studio with mesh editing and multiple pose generation."""
     
-    RETURN_TYPES = ("IMAGE", "STRING")
-    RETURN_NAMES = ("images", "lighting_prompt")
-    OUTPUT_IS_LIST = (True, True)
+    RETURN_TYPES = ("IMAGE", "STRING", "IMAGE", "IMAGE", "IMAGE", "MASK", "STRING", "STRING")
+    RETURN_NAMES = ("images", "lighting_prompt", "depth", "normal", "segmentation", "mask", "camera_prompt", "keypoints")
+    OUTPUT_IS_LIST = (True, True, True, True, True, True, True, True)
     FUNCTION = "generate"
     CATEGORY = "VNCCS/pose"
+
+    # pose_data fields that affect the outputs
+    SEMANTIC_FIELDS = ("mesh", "export", "poses", "lights", "lighting_prompts", "captured_images", "capture_hashes")
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -116,8 +217,9 @@ class VNCCS_PoseStudio:
             if export.get("debugMode", False):
                 return float("NaN")
         except:
-            pass
-        return pose_data
+            return pose_data
+        # Only what affects the outputs (captures by hash), not UI state like the active tab
+        return make_key(**{field: data.get(field) for field in cls.SEMANTIC_FIELDS})
     
     def generate(
         self,
@@ -134,44 +236,12 @@ class VNCCS_PoseStudio:
             # We request a fresh capture/sync from the frontend on every run
             # to ensure the backend uses EXACTLY what the user sees in the widget.
             if unique_id:
-                try:
-                    from server import PromptServer
-                    import time
-                    import folder_paths
-                    
-                    # 1. Request capture
-                    PromptServer.instance.send_sync("vnccs_req_pose_sync", {"node_id": unique_id})
-                    
-                    # 2. Wait for file response
-                    temp_dir = folder_paths.get_temp_directory()
-                    filepath = os.path.join(temp_dir, f"vnccs_debug_{unique_id}.json")
-                    
-                    # Remove old if exists (only if it's very old, but here we just want fresh)
-                    # We don't remove it BEFORE sending the request because the frontend 
-                    # write is async and we might hit a race condition.
-                    
-                    # Wait loop (up to 3s)
-                    start_time = time.time()
-                    while time.time() - start_time < 15.0:
-                            if os.path.exists(filepath):
-                                # Ensure the file is fresh (modified recently)
-                                if os.path.getmtime(filepath) > start_time - 1.0:
-                                    try:
-                                        with open(filepath, "r") as f:
-                                            sync_data = json.load(f)
-                                        # Override data with fresh sync from client
-                                        data = sync_data
-                                        # Cleanup
-                                        try:
-                                            os.remove(filepath)
-                                        except:
-                                            pass
-                                        break
-                                    except:
-                                        pass
-                            time.sleep(0.1)
-                except Exception as e:
-                    print(f"VNCCS Pose Studio Sync Error: {e}")
+                export = data.get("export", {}) if isinstance(data, dict) else {}
+                sync_data = self._request_live_sync(unique_id, export.get("sync_timeout", 15.0),
+                                                    export.get("sync_ack_timeout", 2.0))
+                if sync_data is not None:
+                    # Override data with fresh sync from client
+                    data = sync_data
             # ---------------------------------------------
             
         except (json.JSONDecodeError, TypeError):
@@ -207,350 +277,478 @@ class VNCCS_PoseStudio:
         output_mode = export.get("output_mode", "LIST")
         grid_columns = export.get("grid_columns", 2)
         bg_color = export.get("bg_color", [40, 40, 40])  # RGB
+        supersample = export.get("supersample", 1)  # Fallback renderer anti-aliasing
+        max_influences = export.get("skin_max_influences", None)  # None = all weights
+        skin_mode = export.get("skin_mode", "LBS")  # LBS or DQS (dual quaternion)
+        
+        segmentation = export.get("segmentation", "bone")  # bone or face_group
+        render_workers = export.get("render_workers", 1)  # 0 = one per CPU core
+        if not render_workers or render_workers < 0:
+            render_workers = os.cpu_count() or 1
+        render_cache = export.get("render_cache", True)  # Persistent disk cache of renders
+        render_cache_mb = export.get("render_cache_mb", DEFAULT_MAX_MB)
+        lights = data.get("lights", [])
+        view_size = (view_width, view_height)
+        
+        # Normalize age
+        mh_age = (age - 1.0) / (90.0 - 1.0)
+        mh_age = max(0.0, min(1.0, mh_age))
+        sliders = (mh_age, gender, weight, muscle, height, breast_size, firmness, penis_len, penis_circ, penis_test)
+        cache = _get_render_cache(render_cache_mb) if render_cache else None
         
         poses = data.get("poses", [{}])
         if not poses:
             poses = [{}]
+        
+        # Camera views per pose (fallback renderer): the pose's own list, else the export list
+        views = [self._parse_views(pose.get("views", export.get("views"))) for pose in poses]
+        camera_prompts = [self._camera_prompt(view) for pose_views in views for view in pose_views]
             
+        # === 0. Skeleton only (OpenPose), skips mesh rendering and captures ===
+        if export.get("render_mode", "mesh") == "openpose":
+            images, keypoints = self._render_openpose(sliders, poses, views, view_size, max_influences, skin_mode)
+            return self._build_outputs(images, [""] * len(images), None, output_mode, grid_columns, bg_color,
+                                       camera_prompts, keypoints)
+        
         # === 1. Try Client-Side Rendered Images (CSR) ===
-        # If frontend sent captured images, use them directly.
+        # If frontend sent captured images, use them directly. Maps cannot
+        # match the browser's perspective capture camera, and the browser
+        # captures one default view per pose, so with aux_maps or camera
+        # views the images and maps are all rendered below instead.
+        aux_maps = export.get("aux_maps", False)
+        multi_view = any(pose_views != [None] for pose_views in views)
         captured_images = data.get("captured_images", [])
         
+        captured_blobs = data.get("captured_blobs", [])  # Binary upload (bytes, see _open_capture)
+        if aux_maps or multi_view:
+            captured_images = []
+        elif captured_blobs:
+            captured_images = captured_blobs
+        elif not captured_images and data.get("capture_hashes"):
+            # Saved pose_data references the capture store by hash
+            store = get_capture_store()
+            captured_images = [store.get(digest) if digest else None for digest in data["capture_hashes"]]
+            missing = sum(1 for blob in captured_images if blob is None)
+            if missing:
+                # Images, prompts and poses must line up: render the whole list instead
+                print(f"[VNCCS Pose Studio] {missing} stored captures not found, rendering all poses on the server")
+                captured_images = []
+        
         if captured_images:
-            rendered_images = []
-            
             # Extract prompts (frontend generated)
             lighting_prompts = data.get("lighting_prompts", [])
             
             # Pad prompts to match images count if needed
             while len(lighting_prompts) < len(captured_images):
                 lighting_prompts.append("")
-                
-            for b64 in captured_images:
-                if not b64: continue
-                # Remove header if present (data:image/png;base64,...)
-                if "," in b64:
-                    b64 = b64.split(",", 1)[1]
-                
-                try:
-                    img_data = base64.b64decode(b64)
-                    img = Image.open(BytesIO(img_data)).convert('RGB')
-                    rendered_images.append(img)
-                except Exception as e:
-                    print(f"Pose Studio Error: Failed to decode image: {e}")
             
-            if rendered_images:
-                # Convert to tensors
-                tensors = []
-                for img in rendered_images:
-                    np_img = np.array(img).astype(np.float32) / 255.0
-                    tensors.append(torch.from_numpy(np_img))
-                
-                if output_mode == "LIST":
-                    # Return list of individual images and prompts
-                    tensor_list = [t.unsqueeze(0) for t in tensors]
-                    return (tensor_list, lighting_prompts)
-                else:
-                    grid_img = self._make_grid(rendered_images, grid_columns, tuple(bg_color))
-                    np_grid = np.array(grid_img).astype(np.float32) / 255.0
-                    grid_tensor = torch.from_numpy(np_grid).unsqueeze(0)
-                    
-                    
-                    # For grid, return only the first prompt (conceptually the "main" prompt)
-                    combined_prompt = lighting_prompts[0] if lighting_prompts else ""
-                    return ([grid_tensor], [combined_prompt])
+            # Parallel decode into one preallocated batch
+            rendered_images = _decode_captures(captured_images)
+            
+            if rendered_images is not None and len(rendered_images) == len(poses):
+                # Captures use the browser camera: no maps, no camera prompts
+                return self._build_outputs(rendered_images, lighting_prompts, None, output_mode, grid_columns, bg_color,
+                                           [""] * len(rendered_images))
+            print(f"[VNCCS Pose Studio] Got {0 if rendered_images is None else len(rendered_images)} usable captures "
+                  f"for {len(poses)} poses, rendering them on the server")
         
         # === 2. Fallback to Python Rendering ===
         
-        # Ensure data loaded
-        _ensure_data_loaded()
-        
-        # Normalize age
-        mh_age = (age - 1.0) / (90.0 - 1.0)
-        mh_age = max(0.0, min(1.0, mh_age))
-        
-        # Solve base mesh
-        solver = HumanSolver()
-        factors = solver.calculate_factors(mh_age, gender, weight, muscle, height, breast_size, firmness, penis_len, penis_circ, penis_test)
-        base_verts = solver.solve_mesh(
-            POSE_STUDIO_CACHE['base_mesh'],
-            POSE_STUDIO_CACHE['targets'],
-            factors
-        )
-        
-        # Render each pose
-        rendered_images = []
-        view_size = (view_width, view_height)
+        # Render each pose from each view; depth/normal/segmentation come from the same raster
+        passes = self._render_poses_cached(sliders, poses, view_size, bg_color, lights, supersample,
+                                           max_influences, skin_mode, segmentation, render_workers, cache, views)
+        rendered_images = [p["image"] for p in passes]
         
-        for pose_idx, pose in enumerate(poses):
-            bones = pose.get("bones", {})
-            model_rotation = pose.get("modelRotation", [0, 0, 0])
-            
-            # Apply pose to skeleton and get posed vertices
-            posed_verts = self._apply_pose(base_verts, bones, model_rotation)
-            
-            # Render with background color and current lights
-            img = self._render_mesh(posed_verts, view_size, tuple(bg_color), data.get("lights", []))
-            rendered_images.append(img)
-        
-        # Convert to tensors
-        tensors = []
-        for img in rendered_images:
-            np_img = np.array(img).astype(np.float32) / 255.0
-            tensors.append(torch.from_numpy(np_img))
-        
-        if output_mode == "LIST":
-            # Return list of individual images
-            tensor_list = [t.unsqueeze(0) for t in tensors]
-            # Fallback prompts (empty strings since python renderer doesn't generate them yet)
-            prompts = [""] * len(tensor_list)
-            return (tensor_list, prompts)
-        else:
-            # GRID mode - concatenate into single image
-            grid_img = self._make_grid(rendered_images, grid_columns, tuple(bg_color))
-            np_grid = np.array(grid_img).astype(np.float32) / 255.0
-            grid_tensor = torch.from_numpy(np_grid).unsqueeze(0)
-            return ([grid_tensor], [""])
+        # Fallback prompts (empty strings since python renderer doesn't generate them yet)
+        prompts = [""] * len(rendered_images)
+        return self._build_outputs(rendered_images, prompts, passes, output_mode, grid_columns, bg_color, camera_prompts)
     
-    def _apply_pose(self, verts, bones_data, model_rotation):
-        """Apply bone rotations (FK) and global rotation to vertices."""
-        
-        # 1. Setup Wrapper for Mesh (needed for skeleton update)
-        class MeshWrapper:
-            def __init__(self, v): self.vertices = v
-        
-        mesh_wrapper = MeshWrapper(verts)
-        
-        # 2. Get and copy skeleton
-        # We must copy because we modify joint positions (fitting) and bone rotations
-        orig_skel = POSE_STUDIO_CACHE['skeleton']
-        if not orig_skel:
-            # Should not happen if _ensure_data_loaded is called
-            return verts
-            
-        skel = orig_skel.copy()
-        
-        # 3. Fit skeleton to current mesh (proportions)
-        # This moves joints to match the morphing target
-        skel.updateJointPositions(mesh_wrapper)
-        
-        # 4. Apply rotations to bones
-        deg2rad = np.pi / 180.0
-        
-        for bone_name, rot_deg in bones_data.items():
-            bone = skel.getBone(bone_name)
-            if not bone:
-                continue
-            
-            # Rotation order: Z * Y * X (Extrinsic? Intrinsic?)
-            # Three.js (Frontend) uses Euler XYZ.
-            # Assuming standard composition:
-            rx, ry, rz = rot_deg[0] * deg2rad, rot_deg[1] * deg2rad, rot_deg[2] * deg2rad
-            
-            # Create rotation matrix
-            # Note: matrix.rotx returns 4x4
-            rot_mat = np.dot(
-                matrix.rotz(rz),
-                np.dot(matrix.roty(ry), matrix.rotx(rx))
-            )
-            
-            bone.matPose = rot_mat
+    def _request_live_sync(self, unique_id, timeout=15.0, ack_timeout=2.0):
+        """Ask the widget for its current state and wait for the upload.
 
-        # 5. Update global matrices (FK)
-        # boneslist is breadth-first sorted, so parents always processed before children
-        for bone in skel.boneslist:
-            bone.update()
+        The upload route hands the payload over in-process through a
+        per-node event; the temp file it writes when nobody is registered
+        is still picked up as a fallback. Returns the payload or None.
+        Returns None at once when no browser is connected, and after
+        ack_timeout when no widget acknowledged the request (headless /
+        API queues). Set ack_timeout to 0 to always wait the full timeout.
+        """
+        try:
+            from server import PromptServer
+            import time
+            import folder_paths
+            from ..api.pose_library import begin_pose_sync, end_pose_sync
+        except Exception as e:
+            print(f"VNCCS Pose Studio Sync Error: {e}")
+            return None
+        
+        # Nobody to answer: no websocket clients at all
+        sockets = getattr(PromptServer.instance, "sockets", None)
+        if isinstance(sockets, dict) and not sockets:
+            return None
+        
+        filepath = os.path.join(folder_paths.get_temp_directory(), f"vnccs_debug_{unique_id}.json")
+        waiter = begin_pose_sync(unique_id)
+        try:
+            # 1. Request capture (after registering, so a fast reply is not lost)
+            PromptServer.instance.send_sync("vnccs_req_pose_sync", {"node_id": unique_id})
             
-        # 6. Linear Blend Skinning (LBS)
-        # Pre-allocate result (N, 3)
-        skinned_verts = np.zeros_like(verts)
-        
-        # Helper arrays
-        # Expand verts to (N, 4) for matrix multiplication
-        ones = np.ones((len(verts), 1), dtype=np.float32)
-        verts4 = np.hstack([verts, ones])
-        
-        has_weights = False
-        # Iterate over all bones that have weights
-        # skel.vertexWeights.data is OrderedDict {bone: (indices, weights)}
-        if skel.vertexWeights:
-            has_weights = True
-            for bname, (indices, weights) in skel.vertexWeights.data.items():
-                bone = skel.getBone(bname)
-                if not bone or len(indices) == 0:
-                    continue
-                
-                # Get Skinning Matrix: Pose * InvBind
-                # shape (4, 4)
-                mat_skin = bone.matPoseVerts
-                
-                # Select vertices affected by this bone
-                # v_subset shape (K, 4)
-                v_subset = verts4[indices]
-                
-                # Transform: v' = v * M^T
-                v_transformed = np.asarray(np.dot(v_subset, mat_skin.T))
-                
-                # Weighted accumulation
-                # weights shape (K,) -> reshape to (K, 1)
-                w_expanded = weights[:, np.newaxis]
-                
-                # Optimization: Doing it in place.
-                current = skinned_verts[indices]
-                skinned_verts[indices] = current + v_transformed[:, :3] * w_expanded
+            # 2. Wait for the hand-over; check the fallback file between waits
+            start_time = time.time()
+            while True:
+                elapsed = time.time() - start_time
+                remaining = timeout - elapsed
+                if ack_timeout and not waiter["ack"].is_set():
+                    # Until acknowledged, only wait as long as the ack window
+                    remaining = min(remaining, ack_timeout - elapsed)
+                if waiter["event"].wait(max(0.0, min(0.5, remaining))):
+                    return waiter["data"]
+                # Ensure the file is fresh (modified recently)
+                if os.path.exists(filepath) and os.path.getmtime(filepath) > start_time - 1.0:
+                    try:
+                        with open(filepath, "r") as f:
+                            sync_data = json.load(f)
+                        # Cleanup
+                        try:
+                            os.remove(filepath)
+                        except OSError:
+                            pass
+                        return sync_data
+                    except (OSError, json.JSONDecodeError):
+                        pass
+                if remaining <= 0:
+                    if not waiter["ack"].is_set() and ack_timeout:
+                        print(f"[VNCCS Pose Studio] No widget answered the sync for node {unique_id}, using stored pose data.")
+                    return None
+        except Exception as e:
+            print(f"VNCCS Pose Studio Sync Error: {e}")
+            return None
+        finally:
+            end_pose_sync(unique_id, waiter)
+    
+    def _render_poses_cached(self, sliders, poses, view_size, bg_color, lights, supersample,
+                             max_influences, skin_mode, segmentation, workers=1, cache=None, views=None):
+        """Render all poses with maps, serving what it can from the caches.
 
-        if not has_weights:
-            print("Pose Studio Warning: No weights found, skinning skipped!")
-            skinned_verts = verts.copy()
+        views holds a list of camera dicts per pose (None = default camera);
+        each pose is skinned once and rasterized for all of its views.
+        Returns the render pass dicts flattened in pose, then view order.
 
-        # 7. Apply Global Model Rotation
-        posed = skinned_verts
-        
-        rx, ry, rz = model_rotation
-        if abs(rx) > 0.01 or abs(ry) > 0.01 or abs(rz) > 0.01:
-            # Convert degrees to radians
-            rx, ry, rz = rx * deg2rad, ry * deg2rad, rz * deg2rad
+        The disk cache is consulted before any data is loaded or solved, so
+        a fully cached pose list renders without touching the MakeHuman data.
+        Misses run through the staged pipeline (solve -> fit -> pose -> render),
+        where each stage is memoized on the key of its own inputs.
+        """
+        if views is None:
+            views = [[None]] * len(poses)
+        settings = {
+            "lights": lights, "view_size": list(view_size), "bg_color": list(bg_color),
+            "supersample": supersample, "segmentation": segmentation,
+        }
+        solve_key = make_key(sliders=list(sliders))
+        fit_key = make_key(solve=solve_key)
+        pose_keys = [make_key(fit=fit_key, bones=pose.get("bones", {}), modelRotation=pose.get("modelRotation", [0, 0, 0]),
+                              max_influences=max_influences, skin_mode=skin_mode)
+                     for pose in poses]
+        render_keys = [[make_key(pose=pose_key, view=view, **settings) for view in pose_views]
+                       for pose_key, pose_views in zip(pose_keys, views)]
+        
+        passes = [[None] * len(keys) for keys in render_keys]
+        if cache is not None:
+            passes = [[cache.get(key) for key in keys] for keys in render_keys]
+        
+        # In-memory stages: finished renders, then posed geometry
+        jobs = []
+        for i, pose_passes in enumerate(passes):
+            missing = []
+            for j, p in enumerate(pose_passes):
+                if p is None:
+                    pose_passes[j] = PIPELINE_CACHE.get("render", render_keys[i][j])
+                    if pose_passes[j] is None:
+                        missing.append(j)
+            if missing:
+                jobs.append((i, missing, PIPELINE_CACHE.get("pose", pose_keys[i])))
+        
+        if jobs:
+            # Ensure data loaded
+            _ensure_data_loaded()
             
-            rot_mat = np.dot(
-                matrix.rotz(rz),
-                np.dot(matrix.roty(ry), matrix.rotx(rx))
-            )[:3, :3]
+            base_verts, skel = None, None
+            if any(posed is None for _, _, posed in jobs):
+                base_verts = PIPELINE_CACHE.get_or_compute("solve", solve_key, lambda: self._solve_base_verts(*sliders))
+                skel = PIPELINE_CACHE.get_or_compute("fit", fit_key, lambda: self._fit_skeleton(base_verts))
             
-            # Center for rotation
-            center = posed.mean(axis=0)  # Rotate around body center
-            posed = posed - center
-            posed = np.dot(posed, rot_mat.T)
-            posed = posed + center
-        
-        return posed
+            rendered = self._render_poses(base_verts, skel, fit_key, [poses[i] for i, _, _ in jobs], [posed for _, _, posed in jobs],
+                                          view_size, bg_color, lights, supersample, max_influences, skin_mode,
+                                          segmentation, with_maps=True, workers=workers,
+                                          views=[[views[i][j] for j in missing] for i, missing, _ in jobs])
+            for (i, missing, _), (posed, view_passes) in zip(jobs, rendered):
+                PIPELINE_CACHE.put("pose", pose_keys[i], posed)
+                for j, p in zip(missing, view_passes):
+                    PIPELINE_CACHE.put("render", render_keys[i][j], p)
+                    passes[i][j] = p
+                    if cache is not None:
+                        cache.put(render_keys[i][j], p)
+        
+        stats = PIPELINE_CACHE.report()
+        if stats:
+            print(f"[VNCCS Pose Studio] Pipeline cache hits: {stats}")
+        return [p for pose_passes in passes for p in pose_passes]
     
-    def _render_mesh(self, verts, size, bg_color=(40, 40, 40), lights=[]):
-        """Render mesh with skin-colored Phong shading."""
-        from PIL import Image, ImageDraw
-        
-        base_mesh = POSE_STUDIO_CACHE['base_mesh']
-        
-        # Setup viewport
-        W, H = size
-        img = Image.new('RGB', (W, H), bg_color)
-        draw = ImageDraw.Draw(img)
-        
-        # Project vertices
-        center = verts.mean(axis=0)
-        scale = min(W, H) * 0.4 / max(np.abs(verts - center).max(), 0.001)
-        
-        verts_screen = np.zeros((len(verts), 2))
-        verts_screen[:, 0] = (verts[:, 0] - center[0]) * scale + W / 2
-        verts_screen[:, 1] = H / 2 - (verts[:, 1] - center[1]) * scale
+    def _render_poses(self, base_verts, skel, fit_key, poses, posed_list, view_size, bg_color, lights, supersample=1,
+                      max_influences=None, skin_mode="LBS", segmentation="bone", with_maps=False, workers=1, views=None):
+        """Pose and render every entry in poses. Returns (posed_verts, [passes per view]) per pose.
+
+        Entries of posed_list that are not None are already posed vertices
+        and are only rendered. views holds the camera dicts to render for
+        each pose (default: one default camera). With workers > 1 the poses
+        are spread over a thread pool (see _render_pose_task); results keep
+        the pose order.
+        """
+        if views is None:
+            views = [[None]] * len(poses)
+        args = (view_size, tuple(bg_color), lights, supersample, max_influences, skin_mode,
+                segmentation if with_maps else None)
+        
+        # A single pose renders on this thread; the pool keeps its configured size
+        if workers > 1 and len(poses) > 1:
+            pool = _get_render_pool(workers)
+            futures = [pool.submit(_render_pose_task, base_verts, fit_key, pose, posed, pose_views, args)
+                       for pose, posed, pose_views in zip(poses, posed_list, views)]
+            return [f.result() for f in futures]
+        
+        return [self._render_pose(base_verts, pose, *args, skel=skel, posed_verts=posed, views=pose_views)
+                for pose, posed, pose_views in zip(poses, posed_list, views)]
+    
+    @staticmethod
+    def _parse_views(views):
+        """Normalize a camera view list to dicts (azimuth, elevation, distance); [None] if empty.
+
+        Like VNCCS_VisualPositionControl, invalid values from the widget JSON
+        fall back to the defaults (0, 0, "medium shot"); non-dict entries are
+        skipped.
+        """
+        if not isinstance(views, (list, tuple)):
+            views = []
+        parsed = []
+        for view in views:
+            if not isinstance(view, dict):
+                continue
+            angles = []
+            for key in ("azimuth", "elevation"):
+                try:
+                    angles.append(int(view.get(key, 0)))
+                except (TypeError, ValueError, OverflowError):
+                    print(f"[VNCCS Pose Studio] Invalid view {key} {view.get(key)!r}, using 0")
+                    angles.append(0)
+            distance = view.get("distance", "medium shot")
+            parsed.append({
+                "azimuth": angles[0] % 360,
+                "elevation": angles[1],
+                "distance": distance if isinstance(distance, str) else "medium shot",
+            })
+        return parsed or [None]
+    
+    @staticmethod
+    def _camera_prompt(view):
+        """Camera prompt for a view, matching VNCCS_PositionControl ("" for the default camera)."""
+        if view is None:
+            return ""
+        return VNCCS_PositionControl().generate_prompt(view["azimuth"], view["elevation"], view["distance"], True)[0]
+    
+    def _build_outputs(self, images, prompts, passes, output_mode, grid_columns, bg_color, camera_prompts, keypoints=None):
+        """Convert rendered images and auxiliary maps into node outputs.
+
+        images is a list of PIL images or an already filled float
+        [N, H, W, 3] batch. LIST returns one [1, H, W, C] tensor per image,
+        BATCH a single [N, H, W, C] tensor (per-image prompts joined by
+        newlines) and GRID one composed image. keypoints are OpenPose dicts
+        per image (skeleton mode only).
+        """
+        batch = None if isinstance(images, list) else images
+        sizes = [img.size for img in images] if batch is None else [(batch.shape[2], batch.shape[1])] * len(batch)
+        
+        map_keys = ("depth", "normal", "segmentation", "mask")
+        maps = {}
+        for key in map_keys:
+            if passes is not None:
+                maps[key] = [p[key] for p in passes]
+            else:
+                # No geometry available (client render): empty maps of matching size
+                maps[key] = [np.zeros((h, w) + ((3,) if key != "mask" else ()), dtype=np.float32)
+                             for w, h in sizes]
+        maps["depth"] = [np.repeat(d[..., np.newaxis], 3, axis=2) if d.ndim == 2 else d for d in maps["depth"]]
         
-        # Get valid faces
-        valid_prefixes = ["body", "helper-r-eye", "helper-l-eye", "helper-upper-teeth", "helper-lower-teeth"]
-        faces = []
-        if base_mesh.face_groups:
-            for i, group in enumerate(base_mesh.face_groups):
-                g_clean = group.strip()
-                if g_clean in valid_prefixes:
-                    faces.append(base_mesh.faces[i])
+        if output_mode == "LIST":
+            # Return list of individual images and prompts
+            if batch is not None or len(set(sizes)) == 1:
+                # One batch, handed out as [1, H, W, C] views
+                if batch is None:
+                    batch = self._images_to_batch(images)
+                tensor_list = [batch[i:i + 1] for i in range(len(batch))]
+            else:
+                tensor_list = [self._images_to_batch([img]) for img in images]
+            # Copies: the arrays are still held by the render caches
+            map_lists = [[torch.from_numpy(m).unsqueeze(0).clone() for m in maps[key]] for key in map_keys]
+            keypoint_strs = [json.dumps(k) for k in keypoints] if keypoints else [""] * len(images)
+            return (tensor_list, prompts, *map_lists, camera_prompts, keypoint_strs)
+        
+        # Keypoints of all images as one JSON list, in batch/grid order
+        keypoint_str = json.dumps(keypoints) if keypoints else ""
+        
+        if output_mode == "BATCH":
+            if batch is None:
+                batch = self._images_to_batch(images)
+            H, W = batch.shape[1:3]
+            map_batches = [[self._arrays_to_batch(maps[key], (H, W))] for key in map_keys]
+            return ([batch], ["\n".join(prompts)], *map_batches, ["\n".join(camera_prompts)], [keypoint_str])
+        
+        # GRID mode - compose a single image by tensor slicing
+        bg = torch.tensor(list(bg_color)[:3], dtype=torch.float32).div_(255.0)
+        cells = list(batch) if batch is not None else self._images_to_batch(images, uniform=False)
+        grid_tensor = self._make_grid_tensor(cells, grid_columns, bg).unsqueeze(0)
+        map_grids = [[self._make_grid_tensor([torch.from_numpy(m) for m in maps[key]], grid_columns, 0.0).unsqueeze(0)]
+                     for key in map_keys]
+        # For grid, return only the first prompt (conceptually the "main" prompt)
+        combined_prompt = prompts[0] if prompts else ""
+        # The grid holds every view, so its camera prompts are joined in cell order like BATCH
+        return ([grid_tensor], [combined_prompt], *map_grids, ["\n".join(camera_prompts)], [keypoint_str])
+    
+    @staticmethod
+    def _images_to_batch(images, uniform=True):
+        """Fill one preallocated float [N, H, W, 3] tensor (0-1) from PIL images.
+
+        Images that differ from the first one's size are resized to it. With
+        uniform=False, returns a list of [H, W, 3] tensors at their own size.
+        """
+        if not uniform:
+            return [VNCCS_PoseStudio._images_to_batch([img])[0] for img in images]
         
-        # Render with flat shading
-        self._render_flat_shaded(draw, verts_screen, verts, faces, W, H, lights)
+        w, h = images[0].size
+        staging = np.empty((len(images), h, w, 3), dtype=np.uint8)
+        for i, img in enumerate(images):
+            if img.size != (w, h):
+                print(f"[VNCCS Pose Studio] Resizing image {i} from {img.size} to {(w, h)} for the batch.")
+                img = img.resize((w, h), Image.LANCZOS)
+            staging[i] = np.asarray(img.convert('RGB'))
+        
+        batch = torch.empty((len(images), h, w, 3), dtype=torch.float32)
+        batch.copy_(torch.from_numpy(staging))
+        return batch.div_(255.0)
+    
+    @staticmethod
+    def _arrays_to_batch(arrays, size):
+        """Stack float arrays into one preallocated tensor; mismatched sizes stay zero."""
+        H, W = size
+        batch = torch.zeros((len(arrays), H, W) + arrays[0].shape[2:], dtype=torch.float32)
+        for i, arr in enumerate(arrays):
+            h, w = min(H, arr.shape[0]), min(W, arr.shape[1])
+            batch[i, :h, :w] = torch.from_numpy(arr[:h, :w])
+        return batch
+    
+    @staticmethod
+    def _make_grid_tensor(tensors, columns, fill):
+        """Compose [H, W, ...] tensors into a grid on a preallocated canvas.
+
+        Cells take the first tensor's size; larger tensors are cropped to it.
+        """
+        n = len(tensors)
+        cols = min(columns, n)
+        rows = (n + cols - 1) // cols
         
-        return img
+        h, w = tensors[0].shape[:2]
+        grid = torch.empty((h * rows, w * cols) + tuple(tensors[0].shape[2:]), dtype=torch.float32)
+        grid[:] = fill
+        for i, t in enumerate(tensors):
+            row, col = divmod(i, cols)
+            th, tw = min(h, t.shape[0]), min(w, t.shape[1])
+            grid[row * h:row * h + th, col * w:col * w + tw] = t[:th, :tw]
+        return grid
     
-    def _render_flat_shaded(self, draw, verts_screen, verts_3d, faces, W, H, lights=[]):
-        """Render faces with flat shading and skin color."""
-        # 1. Setup Lighting from params
-        main_light_dir = np.array([0.5, 0.8, 1.0])
-        main_light_int = 0.7
-        ambient_int = 0.3
-        
-        if lights:
-            # Simple aggregation of lights for Python renderer
-            for l in lights:
-                lt = l.get("type", "ambient")
-                if lt == "ambient":
-                    ambient_int = max(0.2, min(0.6, l.get("intensity", 1.0) * 0.4))
-                elif lt == "directional" or lt == "point":
-                    # For point lights we just use direction to center
-                    x, y, z = l.get("x", 0), l.get("y", 10), l.get("z", 10)
-                    main_light_dir = np.array([x, y, z])
-                    mag = np.linalg.norm(main_light_dir)
-                    if mag > 0.001: main_light_dir = main_light_dir / mag
-                    main_light_int = min(1.2, l.get("intensity", 1.0) * 0.8)
-                    break # Use first found as main for flat shading
-        
-        # Skin base color (warm tone)
-        base_color = np.array([212, 165, 116])  # 0xd4a574
-        
-        face_data = []
-        for face in faces:
-            if len(face) < 3:
-                continue
-            
-            # Get vertex indices
-            v_indices = []
-            for item in face:
-                if isinstance(item, (list, tuple)):
-                    v_indices.append(item[0])
-                else:
-                    v_indices.append(item)
-            
-            if any(vi >= len(verts_3d) for vi in v_indices):
-                continue
-            
-            # Calculate face center Z for sorting
-            z_avg = np.mean([verts_3d[vi][2] for vi in v_indices[:3]])
+    def _render_openpose(self, sliders, poses, views, view_size, max_influences=None, skin_mode="LBS"):
+        """Skeleton-only output: OpenPose keypoint images and JSON, no rasterization.
+
+        Runs FK on the fitted skeleton and frames the camera from the posed
+        bone heads and tails (padded by JOINT_FRAMING_MARGIN). Only the few
+        face keypoint vertices are skinned, never the mesh. Returns (images,
+        keypoint dicts) in pose, then view order.
+        """
+        _ensure_data_loaded()
+        solve_key = make_key(sliders=list(sliders))
+        fit_key = make_key(solve=solve_key)
+        base_verts = PIPELINE_CACHE.get_or_compute("solve", solve_key, lambda: self._solve_base_verts(*sliders))
+        skel = PIPELINE_CACHE.get_or_compute("fit", fit_key, lambda: self._fit_skeleton(base_verts))
+        if skel is None:
+            raise Exception("OpenPose mode needs the MakeHuman skeleton, which was not found.")
+        face_points = _get_face_keypoint_vertices()
+        face_names = [name for name in OPENPOSE_KEYPOINTS if name in face_points]
+        face_index = np.concatenate([np.atleast_1d(face_points[name]) for name in face_names]).astype(np.int64)
+        face_split = np.cumsum([len(np.atleast_1d(face_points[name])) for name in face_names])[:-1]
+        lengths = np.array([bone.length for bone in skel.boneslist], dtype=np.float32)
+        
+        W, H = view_size
+        images, keypoints = [], []
+        for pose, pose_views in zip(poses, views):
+            self._pose_skeleton(skel, pose.get("bones", {}))
             
-            # Calculate normal
-            p0 = verts_3d[v_indices[0]]
-            p1 = verts_3d[v_indices[1]]
-            p2 = verts_3d[v_indices[2]]
+            # Posed joints: bone heads and tails (bones point along their local Y)
+            mats = np.stack([bone.matPoseGlobal for bone in skel.boneslist]).astype(np.float32)
+            heads = mats[:, :3, 3]
+            joints = np.concatenate([heads, heads + mats[:, :3, 1] * lengths[:, np.newaxis]])
             
-            v1 = p1 - p0
-            v2 = p2 - p0
-            normal = np.cross(v1, v2)
-            norm_len = np.linalg.norm(normal)
-            if norm_len < 1e-8:
-                continue
-            normal = normal / norm_len
+            # Face points from their skinned vertices only
+            if skel.vertexWeights:
+                face_verts = skel.skinMesh(base_verts, max_influences, dualQuaternion=(skin_mode == "DQS"),
+                                           indices=face_index)
+            else:
+                face_verts = np.asarray(base_verts, dtype=np.float32)[face_index]
+            face_pos = dict(zip(face_names, (v.mean(axis=0) for v in np.split(face_verts, face_split))))
             
-            # Lighting
-            diffuse = max(0, np.dot(normal, main_light_dir))
-            intensity = min(1.0, ambient_int + diffuse * main_light_int)
+            points = np.zeros((len(OPENPOSE_KEYPOINTS), 3), dtype=np.float32)
+            for k, name in enumerate(OPENPOSE_KEYPOINTS):
+                if name in face_pos:
+                    points[k] = face_pos[name]
+                else:
+                    bone = skel.getBone(name)
+                    if bone is not None:
+                        points[k] = bone.matPoseGlobal[:3, 3]
             
-            color = (base_color * intensity).astype(int)
-            color = tuple(np.clip(color, 0, 255))
+            # Model rotation about the joints' center, for keypoints and framing alike
+            model_rotation = pose.get("modelRotation", [0, 0, 0])
+            center = joints.mean(axis=0)
+            joints = self._rotate_model(joints, model_rotation, center)
+            points = self._rotate_model(points, model_rotation, center)
             
-            face_data.append((z_avg, v_indices, color))
-        
-        # Sort by depth (painter's algorithm)
-        face_data.sort(key=lambda x: x[0])
+            for view in pose_views:
+                camera = self._camera_framing(joints, W, H, view, margin=JOINT_FRAMING_MARGIN)
+                _, screen = self._project(points, camera, W, H)
+                visible = (screen[:, 0] >= 0) & (screen[:, 0] < W) & (screen[:, 1] >= 0) & (screen[:, 1] < H)
+                images.append(self._draw_openpose(screen, visible, W, H))
+                
+                flat = []
+                for (x, y), vis in zip(screen.tolist(), visible.tolist()):
+                    flat.extend([round(x, 2), round(y, 2), 1.0] if vis else [0.0, 0.0, 0.0])
+                keypoints.append({"people": [{"pose_keypoints_2d": flat}], "canvas_width": W, "canvas_height": H})
         
-        # Draw faces
-        for _, v_indices, color in face_data:
-            points = [(verts_screen[vi][0], verts_screen[vi][1]) for vi in v_indices[:4]]
-            if len(points) >= 3:
-                draw.polygon(points, fill=color)
+        return images, keypoints
+    
+    def _draw_openpose(self, screen, visible, W, H):
+        """Draw keypoints in the standard OpenPose colors on black."""
+        img = Image.new('RGB', (W, H), (0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        unit = min(W, H) / 512.0
+        stick = max(1, int(round(8 * unit)))
+        radius = max(1, 4 * unit)
+        
+        # Limbs at 60% intensity like the reference renderer, joints on top
+        for (a, b), color in zip(OPENPOSE_LIMBS, OPENPOSE_COLORS):
+            if visible[a] and visible[b]:
+                draw.line([tuple(screen[a]), tuple(screen[b])], fill=tuple(int(c * 0.6) for c in color), width=stick)
+        for (x, y), vis, color in zip(screen, visible, OPENPOSE_COLORS):
+            if vis:
+                draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=color)
+        return img
     
-    def _make_grid(self, images, columns, bg_color=(40, 40, 40)):
-        """Combine images into a grid."""
-        if not images:
-            return Image.new('RGB', (512, 512), bg_color)
-        
-        n = len(images)
-        cols = min(columns, n)
-        rows = (n + cols - 1) // cols
-        
-        w, h = images[0].size
-        grid = Image.new('RGB', (w * cols, h * rows), bg_color)
-        
-        for i, img in enumerate(images):
-            row = i // cols
-            col = i % cols
-            grid.paste(img, (col * w, row * h))
-        
-        return grid
-
 
 # Node mappings
 NODE_CLASS_MAPPINGS = {
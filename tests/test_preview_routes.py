@@ -0,0 +1,61 @@
+"""Route table checks for the Pose Studio preview API.
+
+Run with: python -m unittest discover -s tests
+(pytest would import the package __init__, which needs a ComfyUI install).
+"""
+
+import importlib
+import os
+import sys
+import types
+import unittest
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+PACKAGE = "vnccs_utils_under_test"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_character_preview():
+    # Import api/ without the package __init__, which registers nodes with ComfyUI
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.api.character_preview")
+
+
+def _comfy_app(routes):
+    """Add routes to an app the way ComfyUI's PromptServer.add_routes does."""
+    api_routes = web.RouteTableDef()
+    for route in routes:
+        if isinstance(route, web.RouteDef):
+            api_routes.route(route.method, "/api" + route.path)(route.handler, **route.kwargs)
+    app = web.Application()
+    app.add_routes(api_routes)
+    app.add_routes(routes)
+    return app
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class PreviewRoutesTest(unittest.TestCase):
+    def test_routes_have_api_aliases(self):
+        # The widget calls them through api.fetchApi() / api.apiURL(), i.e. under /api
+        routes = web.RouteTableDef()
+        _import_character_preview().register_routes(routes)
+        app = _comfy_app(routes)
+
+        registered = {(route.method, route.resource.canonical) for route in app.router.routes()}
+        for method, path in [("POST", "/vnccs/character_studio/update_preview"),
+                             ("GET", "/vnccs/character_studio/topology"),
+                             ("GET", "/vnccs/character_studio/preview_stats"),
+                             ("GET", "/vnccs/character_studio/preview_stream")]:
+            self.assertIn((method, path), registered)
+            self.assertIn((method, "/api" + path), registered)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -36,6 +36,66 @@ const ThreeModuleLoader = {
     }
 };
 
+// Quiet time after the last mesh preview before every pose is recaptured and stored
+const FULL_CAPTURE_DELAY_MS = 400;
+
+// === Binary preview payloads (see api/binary_payload.py) ===
+const BINARY_CONTENT_TYPE = "application/octet-stream";
+const BINARY_DTYPES = {
+    float32: Float32Array, uint32: Uint32Array, int16: Int16Array, uint16: Uint16Array, uint8: Uint8Array
+};
+
+// Header length (uint32 LE), JSON header, then raw little-endian buffers wrapped as typed array views
+function decodeBinaryPayload(buffer) {
+    const size = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, size)));
+    const start = 4 + size;
+    for (const [name, desc] of Object.entries(header.buffers || {})) {
+        const TypedArray = BINARY_DTYPES[desc.dtype];
+        header[name] = new TypedArray(buffer, start + desc.offset, desc.length);
+    }
+    delete header.buffers;
+
+    // Per-bone weights are [start, count] slices of two shared buffers
+    if (header.weight_ranges) {
+        header.weights = {};
+        for (const [bone, [first, count]] of Object.entries(header.weight_ranges)) {
+            header.weights[bone] = {
+                indices: header.weight_indices.subarray(first, first + count),
+                weights: header.weight_values.subarray(first, first + count)
+            };
+        }
+    }
+    return header;
+}
+
+function readPreviewResponse(response) {
+    if ((response.headers.get("Content-Type") || "").includes(BINARY_CONTENT_TYPE)) {
+        return response.arrayBuffer().then(decodeBinaryPayload);
+    }
+    return response.json();
+}
+
+// Static preview topology (indices, UVs, bone hierarchy, weights) by variant, shared by all widgets
+const PREVIEW_TOPOLOGY = {};
+
+async function withPreviewTopology(dynamic) {
+    // update_preview with parts: "dynamic" only returns vertices and joints; add the static bundle
+    if (!dynamic.topology) return dynamic;
+    const { variant, version } = dynamic.topology;
+    let topology = PREVIEW_TOPOLOGY[variant];
+    if (!topology || topology.version !== version) {
+        // Revalidated by ETag, so usually served from the browser cache
+        const res = await api.fetchApi(`/vnccs/character_studio/topology?variant=${variant}`, {
+            headers: { "Accept": `${BINARY_CONTENT_TYPE}, application/json` }
+        });
+        topology = await readPreviewResponse(res);
+        topology.version = version;
+        PREVIEW_TOPOLOGY[variant] = topology;
+    }
+    return { ...topology, ...dynamic };
+}
+
 // === IK Chain Definitions ===
 const IK_CHAINS = {
     hips: {
@@ -884,6 +944,10 @@ const STYLES = `
     background: #20a0a0;
 }
 
+.vnccs-ps-toggle-btn.batch.active {
+    background: #6a60d0;
+}
+
 .vnccs-ps-toggle-btn.grid.active {
     background: #e0a020;
 }
@@ -2847,8 +2911,9 @@ class PoseViewer {
         this.jointMarkers = [];
 
         // Geometry
-        const vertices = new Float32Array(data.vertices);
-        const indices = new Uint32Array(data.indices);
+        // Binary responses already hold typed arrays; use them without copying
+        const vertices = data.vertices instanceof Float32Array ? data.vertices : new Float32Array(data.vertices);
+        const indices = data.indices instanceof Uint32Array ? data.indices : new Uint32Array(data.indices);
         const geometry = new THREE.BufferGeometry();
         geometry.setAttribute('position', new THREE.BufferAttribute(vertices, 3));
         geometry.setIndex(new THREE.BufferAttribute(indices, 1));
@@ -2908,11 +2973,17 @@ class PoseViewer {
 
         // Weights
         const vCount = vertices.length / 3;
-        const skinInds = new Float32Array(vCount * 4);
-        const skinWgts = new Float32Array(vCount * 4);
+        let skinInds = new Float32Array(vCount * 4);
+        let skinWgts = new Float32Array(vCount * 4);
+        let normalizedWeights = false;
         const boneHeads = this.boneList.map(b => b.userData.headPos);
 
-        if (data.weights) {
+        if (data.skin_indices && data.skin_weights) {
+            // Server-computed top-4 attributes (bone indices in data.bones order, unorm16 weights)
+            skinInds = data.skin_indices;
+            skinWgts = data.skin_weights;
+            normalizedWeights = true;
+        } else if (data.weights) {
             const vWeights = new Array(vCount).fill(null).map(() => []);
             const boneMap = {};
             this.boneList.forEach((b, i) => boneMap[b.name] = i);
@@ -2959,10 +3030,11 @@ class PoseViewer {
         }
 
         geometry.setAttribute('skinIndex', new THREE.BufferAttribute(skinInds, 4));
-        geometry.setAttribute('skinWeight', new THREE.BufferAttribute(skinWgts, 4));
+        geometry.setAttribute('skinWeight', new THREE.BufferAttribute(skinWgts, 4, normalizedWeights));
 
         if (data.uvs && data.uvs.length > 0) {
-            geometry.setAttribute('uv', new THREE.BufferAttribute(new Float32Array(data.uvs), 2));
+            const uvs = data.uvs instanceof Float32Array ? data.uvs : new Float32Array(data.uvs);
+            geometry.setAttribute('uv', new THREE.BufferAttribute(uvs, 2));
         }
 
         // Determine which texture file to load based on skin_type
@@ -3627,6 +3699,11 @@ class PoseStudioWidget {
         this.poses = [{}];  // Array of pose data
         this.activeTab = 0;
         this.poseCaptures = []; // Cache for captured images
+        this.captureHashes = new Map(); // Capture (data URL or store URL) -> hash in the server capture store
+        this.previewSession = Math.random().toString(36).slice(2); // Coalesces this widget's preview requests on the server
+        this.meshDragging = false; // A mesh slider is held: captures wait for its release
+        this.fullCaptureTimer = null;
+        this.fullCapturePending = false;
         this.ikMode = false; // IK mode toggle (false = FK, true = IK)
 
         // Slider values
@@ -4125,14 +4202,18 @@ class PoseStudioWidget {
         const btnList = document.createElement("button");
         btnList.className = "vnccs-ps-toggle-btn list";
         btnList.innerText = "List";
+        const btnBatch = document.createElement("button");
+        btnBatch.className = "vnccs-ps-toggle-btn batch";
+        btnBatch.innerText = "Batch";
         const btnGrid = document.createElement("button");
         btnGrid.className = "vnccs-ps-toggle-btn grid";
         btnGrid.innerText = "Grid";
 
         const updateModeUI = () => {
-            const isGrid = this.exportParams.output_mode === 'GRID';
-            btnList.classList.toggle("active", !isGrid);
-            btnGrid.classList.toggle("active", isGrid);
+            const mode = this.exportParams.output_mode;
+            btnList.classList.toggle("active", mode !== 'GRID' && mode !== 'BATCH');
+            btnBatch.classList.toggle("active", mode === 'BATCH');
+            btnGrid.classList.toggle("active", mode === 'GRID');
         };
 
         btnList.onclick = () => {
@@ -4140,6 +4221,11 @@ class PoseStudioWidget {
             updateModeUI();
             this.syncToNode(true);
         }
+        btnBatch.onclick = () => {
+            this.exportParams.output_mode = 'BATCH';
+            updateModeUI();
+            this.syncToNode(true);
+        }
         btnGrid.onclick = () => {
             this.exportParams.output_mode = 'GRID';
             updateModeUI();
@@ -4148,6 +4234,7 @@ class PoseStudioWidget {
 
         updateModeUI();
         modeToggle.appendChild(btnList);
+        modeToggle.appendChild(btnBatch);
         modeToggle.appendChild(btnGrid);
         modeField.appendChild(modeLabel);
         modeField.appendChild(modeToggle);
@@ -4585,6 +4672,14 @@ class PoseStudioWidget {
         });
 
         if (!isExport) {
+            // Preview frames during a drag only update the viewer; the poses are captured after release
+            slider.addEventListener("pointerdown", () => {
+                this.meshDragging = true;
+                window.addEventListener("pointerup", () => {
+                    this.meshDragging = false;
+                    if (this.fullCapturePending) this.scheduleFullCapture();
+                }, { once: true });
+            });
             this.sliders[key] = { slider, label: valueSpan, def: { key, label, min, max, step } };
         } else {
             this.exportWidgets[key] = slider;
@@ -5932,48 +6027,171 @@ class PoseStudioWidget {
 
         return api.fetchApi("/vnccs/character_studio/update_preview", {
             method: "POST",
-            body: JSON.stringify(this.meshParams)
-        }).then(r => r.json()).then(d => {
-            if (this.viewer) {
-                // Keep camera during updates
-                this.viewer.loadData(d, true);
-
-                // Apply lighting configuration
-                this.viewer.updateLights(this.lightParams);
-
-                // FORCE camera sync on every model change (as requested)
-                this.viewer.snapToCaptureCamera(
-                    this.exportParams.view_width,
-                    this.exportParams.view_height,
-                    this.exportParams.cam_zoom || 1.0,
-                    this.exportParams.cam_offset_x || 0,
-                    this.exportParams.cam_offset_y || 0
-                );
-
-                // Apply pose immediately (no timeout/flicker)
-                if (this.viewer.initialized) {
-                    this.viewer.setPose(this.poses[this.activeTab] || {});
-                    this.updateRotationSliders();
-                    // Full recapture needed because mesh changed
-                    this.syncToNode(true);
+            headers: { "Accept": `${BINARY_CONTENT_TYPE}, application/json` },
+            body: JSON.stringify({
+                ...this.meshParams,
+                parts: "dynamic",
+                session: this.previewSession,
+                encoding: "delta",
+                base_version: this.previewVersion ?? null
+            })
+        }).then(r => {
+            if (!r.ok) {
+                // Server preview queue full: the update queue retries with the latest sliders after Retry-After
+                if (r.status === 503) {
+                    this.pendingMeshUpdate = true;
+                    this.meshRetryDelay = (parseFloat(r.headers.get("Retry-After")) || 1) * 1000;
+                } else {
+                    console.error("[VNCCS] Preview update failed:", r.status);
                 }
+                return null;
+            }
+            return readPreviewResponse(r).then(withPreviewTopology);
+        }).then(d => {
+            // Superseded by a newer request from this widget; that one updates the model
+            if (!d || d.status === "stale") return;
+            const frame = this.applyVertexUpdate(d);
+            if (!frame) {
+                // Out of sync with the server: processMeshUpdate asks again for a full frame
+                this.pendingMeshUpdate = true;
+                return;
             }
+            this.applyPreview(frame);
         }).finally(() => {
             if (this.loadingOverlay) this.loadingOverlay.style.display = "none";
         });
     }
 
+    applyPreview(d) {
+        if (this.viewer) {
+            // Keep camera during updates
+            this.viewer.loadData(d, true);
+
+            // Apply lighting configuration
+            this.viewer.updateLights(this.lightParams);
+
+            // FORCE camera sync on every model change (as requested)
+            this.viewer.snapToCaptureCamera(
+                this.exportParams.view_width,
+                this.exportParams.view_height,
+                this.exportParams.cam_zoom || 1.0,
+                this.exportParams.cam_offset_x || 0,
+                this.exportParams.cam_offset_y || 0
+            );
+
+            // Apply pose immediately (no timeout/flicker)
+            if (this.viewer.initialized) {
+                this.viewer.setPose(this.poses[this.activeTab] || {});
+                this.updateRotationSliders();
+                // Full recapture needed because mesh changed
+                this.scheduleFullCapture();
+            }
+        }
+    }
+
+    scheduleFullCapture() {
+        // Recapture (and upload to the capture store) once the mesh settles, not for every
+        // preview frame: a streamed slider drag applies up to 30 frames per second
+        clearTimeout(this.fullCaptureTimer);
+        this.fullCaptureTimer = null;
+        this.fullCapturePending = this.meshDragging;
+        if (this.meshDragging) return;
+        this.fullCaptureTimer = setTimeout(() => {
+            this.fullCaptureTimer = null;
+            this.syncToNode(true);
+        }, FULL_CAPTURE_DELAY_MS);
+    }
+
+    openPreviewStream() {
+        // Websocket for live slider previews; stays closed if the backend has no stream route
+        if (this.previewStream || this.previewStreamUnavailable || typeof WebSocket === "undefined") return;
+        const url = new URL(api.apiURL("/vnccs/character_studio/preview_stream"), window.location.href);
+        url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+        const ws = new WebSocket(url);
+        ws.binaryType = "arraybuffer";
+        this.previewStream = ws;
+
+        let opened = false;
+        let frames = Promise.resolve(); // Apply frames strictly in order (deltas build on each other)
+        ws.onopen = () => { opened = true; };
+        ws.onmessage = (event) => {
+            if (typeof event.data === "string") {
+                console.warn("[VNCCS] Preview stream:", event.data);
+                return;
+            }
+            frames = frames.then(() => withPreviewTopology(decodeBinaryPayload(event.data))).then(d => {
+                const frame = this.applyVertexUpdate(d);
+                if (!frame) {
+                    this.streamMeshParams(true);
+                    return;
+                }
+                this.applyPreview(frame);
+            }).catch(e => console.error("[VNCCS] Preview stream frame failed:", e));
+        };
+        ws.onclose = () => {
+            if (!opened) this.previewStreamUnavailable = true;
+            if (this.previewStream === ws) this.previewStream = null;
+        };
+    }
+
+    streamMeshParams(resync = false) {
+        // Send the sliders over the open stream; the server solves only the newest state
+        const ws = this.previewStream;
+        if (!ws || ws.readyState !== WebSocket.OPEN) return false;
+        ws.send(JSON.stringify({ ...this.meshParams, resync }));
+        return true;
+    }
+
+    applyVertexUpdate(d) {
+        // Quantized vertices (position = center + q * scale): all of them, or the changed ones since base
+        const update = d.vertex_update;
+        if (!update) return d;
+        const { center, scale } = update;
+        const positions = d.positions;
+        let vertices;
+        if (update.base === null) {
+            vertices = new Float32Array(positions.length);
+            for (let i = 0; i < positions.length; i++) {
+                vertices[i] = center[i % 3] + positions[i] * scale[i % 3];
+            }
+        } else {
+            if (update.base !== this.previewVersion || !this.previewVertices) {
+                // Out of sync with the server; the caller asks again for a full frame
+                this.previewVersion = null;
+                return null;
+            }
+            // Copy: the previous array now belongs to the displayed geometry
+            vertices = this.previewVertices.slice();
+            const changed = d.changed;
+            for (let k = 0; k < changed.length; k++) {
+                const v = changed[k] * 3;
+                for (let a = 0; a < 3; a++) vertices[v + a] = center[a] + positions[k * 3 + a] * scale[a];
+            }
+        }
+        this.previewVertices = vertices;
+        this.previewVersion = update.version;
+        return { ...d, vertices };
+    }
+
     processMeshUpdate() {
         if (this.isMeshUpdating) return;
         this.isMeshUpdating = true;
         this.pendingMeshUpdate = false;
 
-        this.loadModel().finally(() => {
+        this.loadModel().finally(() => this.finishMeshUpdate(() => this.processMeshUpdate()));
+    }
+
+    finishMeshUpdate(next) {
+        // Run the queued update now, or after the server's Retry-After when it was busy.
+        // isMeshUpdating stays set while waiting, so slider changes only mark the update pending.
+        const delay = this.meshRetryDelay;
+        this.meshRetryDelay = 0;
+        const run = () => {
             this.isMeshUpdating = false;
-            if (this.pendingMeshUpdate) {
-                this.processMeshUpdate();
-            }
-        });
+            if (this.pendingMeshUpdate) next();
+        };
+        if (delay) setTimeout(run, delay);
+        else run();
     }
 
     refreshLightUI() {
@@ -6259,6 +6477,10 @@ class PoseStudioWidget {
             }
         }
 
+        // Live stream when connected (the server drops intermediate states)
+        this.openPreviewStream();
+        if (this.streamMeshParams()) return;
+
         // Async Queue update
         this.pendingMeshUpdate = true;
 
@@ -6266,12 +6488,7 @@ class PoseStudioWidget {
         this.isMeshUpdating = true;
         this.pendingMeshUpdate = false;
 
-        this.loadModel(false).finally(() => {
-            this.isMeshUpdating = false;
-            if (this.pendingMeshUpdate) {
-                this.onMeshParamsChanged();
-            }
-        });
+        this.loadModel(false).finally(() => this.finishMeshUpdate(() => this.onMeshParamsChanged()));
     }
 
     resize() {
@@ -6639,7 +6856,14 @@ class PoseStudioWidget {
         };
     }
 
-    syncToNode(fullCapture = false) {
+    needsCaptures() {
+        // The server renders these modes itself; browser captures would be discarded
+        const hasViews = v => Array.isArray(v) && v.length > 0;
+        if (this.exportParams.render_mode === "openpose" || this.exportParams.aux_maps) return false;
+        return !hasViews(this.exportParams.views) && !this.poses.some(p => p && hasViews(p.views));
+    }
+
+    syncToNode(fullCapture = false, storeCaptures = true, capture = true) {
         if (this.radarRedraw) this.radarRedraw();
 
         // Save current pose before syncing
@@ -6659,7 +6883,7 @@ class PoseStudioWidget {
         while (this.lightingPrompts.length > this.poses.length) this.lightingPrompts.pop();
 
         // Capture Image (CSR)
-        if (this.viewer && this.viewer.initialized) {
+        if (capture && this.viewer && this.viewer.initialized) {
             const w = this.exportParams.view_width || 1024;
             const h = this.exportParams.view_height || 1024;
             const bg = this.exportParams.bg_color || [40, 40, 40];
@@ -6786,25 +7010,76 @@ class PoseStudioWidget {
         }
 
         // Update hidden pose_data widget
+        if (!this.writePoseData() && storeCaptures) {
+            this.storeCaptures();
+        }
+    }
+
+    writePoseData() {
         // Exclude background_url from export to avoid inflating pose_data widget
         const exportToSave = { ...this.exportParams };
         delete exportToSave.background_url;
 
+        // Captures are saved by hash; base64 only until they reach the capture store
+        const captures = this.poseCaptures || [];
+        const allStored = captures.every(c => !c || this.captureHashes.has(c));
+
         const data = {
             mesh: this.meshParams,
             export: exportToSave,
             poses: this.poses,
             lights: this.lightParams,
             activeTab: this.activeTab,
-            captured_images: this.poseCaptures,
+            capture_hashes: captures.map(c => (c && this.captureHashes.get(c)) || null),
             lighting_prompts: this.lightingPrompts,
             background_url: this.exportParams.background_url || null
         };
+        if (!allStored) data.captured_images = captures;
 
         const widget = this.node.widgets?.find(w => w.name === "pose_data");
         if (widget) {
             widget.value = JSON.stringify(data);
         }
+        return allStored;
+    }
+
+    async storeCaptures() {
+        // Upload captures missing from the server store, then save pose_data with hashes only
+        if (this._storingCaptures) {
+            this._storeCapturesAgain = true;
+            return;
+        }
+        this._storingCaptures = true;
+        try {
+            do {
+                this._storeCapturesAgain = false;
+                for (const capture of [...(this.poseCaptures || [])]) {
+                    if (!capture || this.captureHashes.has(capture)) continue;
+                    const blob = await (await fetch(capture)).blob();
+                    const res = await fetch('/vnccs/pose_captures', {
+                        method: 'POST',
+                        headers: { 'Content-Type': blob.type || 'image/png' },
+                        body: blob
+                    });
+                    if (!res.ok) return; // Older backend: keep base64 in pose_data
+                    this.captureHashes.set(capture, (await res.json()).hash);
+                }
+            } while (this._storeCapturesAgain);
+
+            this.pruneCaptureHashes();
+            this.writePoseData();
+        } catch (e) {
+            console.warn("[VNCCS] Failed to store captures:", e);
+        } finally {
+            this._storingCaptures = false;
+        }
+    }
+
+    pruneCaptureHashes() {
+        const current = new Set(this.poseCaptures || []);
+        for (const capture of this.captureHashes.keys()) {
+            if (!current.has(capture)) this.captureHashes.delete(capture);
+        }
     }
 
     loadFromNode() {
@@ -6892,6 +7167,10 @@ class PoseStudioWidget {
 
             if (data.captured_images && Array.isArray(data.captured_images)) {
                 this.poseCaptures = data.captured_images;
+            } else if (data.capture_hashes && Array.isArray(data.capture_hashes)) {
+                // Stored captures are served by hash (immutable, browser-cached)
+                this.poseCaptures = data.capture_hashes.map(h => h ? `/vnccs/pose_captures/${h}` : null);
+                this.poseCaptures.forEach((url, i) => { if (url) this.captureHashes.set(url, data.capture_hashes[i]); });
             }
 
             this.updateTabs();
@@ -6922,18 +7201,32 @@ app.registerExtension({
             const nodeId = event.detail.node_id;
             const node = app.graph.getNodeById(nodeId);
             if (node && node.studioWidget) {
+                // Acknowledge right away so the backend knows an answer is coming
+                fetch('/vnccs/pose_sync/ack', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ node_id: nodeId })
+                }).catch(() => { });
+
                 try {
+                    // Server-rendered modes only need pose_data: no capture, meta-only upload
+                    const withCaptures = node.studioWidget.needsCaptures();
+
                     // Safe mode: ensure viewer is initialized
-                    if (!node.studioWidget.viewer || !node.studioWidget.viewer.initialized) {
+                    if (withCaptures && (!node.studioWidget.viewer || !node.studioWidget.viewer.initialized)) {
                         console.log("[VNCCS] Viewer not initialized on sync. Auto-loading model...");
                         await node.studioWidget.loadModel();
                     }
 
-                    // Update lights and state before capture
-                    if (node.studioWidget.viewer) {
-                        node.studioWidget.viewer.updateLights(node.studioWidget.lightParams);
+                    if (withCaptures) {
+                        // Update lights and state before capture
+                        if (node.studioWidget.viewer) {
+                            node.studioWidget.viewer.updateLights(node.studioWidget.lightParams);
+                        }
+                        node.studioWidget.syncToNode(true, false); // The sync upload stores the captures
+                    } else {
+                        node.studioWidget.syncToNode(false, false, false);
                     }
-                    node.studioWidget.syncToNode(true);
 
                     // 2. Retrieve data
                     const poseWidget = node.widgets.find(w => w.name === "pose_data");
@@ -6941,12 +7234,38 @@ app.registerExtension({
                         const data = JSON.parse(poseWidget.value);
                         data.node_id = nodeId;
 
-                        // 3. Upload to sync endpoint
-                        await fetch('/vnccs/pose_sync/upload_capture', {
+                        // 3. Upload to sync endpoint: captures as binary parts (no base64)
+                        const widget = node.studioWidget;
+                        const captures = withCaptures ? (widget.poseCaptures || []).filter(c => c) : [];
+                        const form = new FormData();
+                        for (let i = 0; i < captures.length; i++) {
+                            const blob = await (await fetch(captures[i])).blob();
+                            form.append("image", blob, `pose_${i}.${blob.type === "image/webp" ? "webp" : "png"}`);
+                        }
+                        const meta = { ...data };
+                        delete meta.captured_images;
+                        delete meta.capture_hashes;
+                        form.append("meta", JSON.stringify(meta));
+
+                        const res = await fetch('/vnccs/pose_sync/upload_capture_binary', {
                             method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify(data)
+                            body: form
                         });
+                        if (res.ok) {
+                            // The server stored the captures; keep only their hashes in pose_data
+                            const hashes = (await res.json()).hashes || [];
+                            captures.forEach((c, i) => { if (hashes[i]) widget.captureHashes.set(c, hashes[i]); });
+                            widget.pruneCaptureHashes();
+                            widget.writePoseData();
+                        } else {
+                            // Older backend: JSON upload with data URLs
+                            data.captured_images = withCaptures ? widget.poseCaptures : [];
+                            await fetch('/vnccs/pose_sync/upload_capture', {
+                                method: 'POST',
+                                headers: { 'Content-Type': 'application/json' },
+                                body: JSON.stringify(data)
+                            });
+                        }
                     }
                 } catch (e) {
                     console.error("[VNCCS] Batch Sync Error:", e);